@@ -20,10 +20,12 @@
 
 from __future__ import with_statement
 from sys import stdout
+from StringIO import StringIO
 from os import path
 from getopt import GetoptError
 from cppheaderparser import CppHeaderObserver
-from cppheaderparser import CppHeaderParser
+from cppheadermodel import CppHeaderModel
+from cppmerge import mergeStubs
 from fgutils import dieOnExists
 from templateparser import TemplateParser
 from filedepot import FileDepot
@@ -53,32 +55,41 @@ class CppGenImpl(CppHeaderObserver):
         if self.__parser__.isPartOfTemplateClass():
             return
 
+        signature = StringIO()
         if template:
-            self.__output.write("%s\n" % self.__parser__.assemblyTemplate(template))
+            signature.write("%s\n" % self.__parser__.assemblyTemplate(template))
         if returnType:
-            self.__output.write("%s " % returnType)
-        self.__printScopes(scopes, self.__output)
-        self.__output.write(funcName)
-        self.__output.write("(%s)" % self.__parser__.assemblyParamList(paramList))
+            signature.write("%s " % returnType)
+        self.__printScopes(scopes, signature)
+        signature.write(funcName)
+        signature.write("(%s)" % self.__parser__.assemblyParamList(paramList))
         if const:
-            self.__output.write(" const")
-        self.__output.write("\n{\n}\n\n")
+            signature.write(" const")
+        self.writeStub(scopes, signature.getvalue())
 
     def onDtorDecl(self, scopes, dtorName):
         if self.__parser__.isPartOfTemplateClass():
             return
 
-        self.__printScopes(scopes, self.__output)
-        self.__output.write(dtorName)
-        self.__output.write("()\n{\n}\n\n")
+        signature = StringIO()
+        self.__printScopes(scopes, signature)
+        signature.write("%s()" % dtorName)
+        self.writeStub(scopes, signature.getvalue())
 
     def onCtorDecl(self, scopes, ctorName, paramList):
         if self.__parser__.isPartOfTemplateClass():
             return
 
-        self.__printScopes(scopes, self.__output)
-        self.__output.write(ctorName)
-        self.__output.write("(%s)\n{\n}\n\n" % self.__parser__.assemblyParamList(paramList))
+        signature = StringIO()
+        self.__printScopes(scopes, signature)
+        signature.write("%s(%s)" % (ctorName, self.__parser__.assemblyParamList(paramList)))
+        self.writeStub(scopes, signature.getvalue())
+
+    def writeStub(self, scopes, signature):
+        """
+        Write the stub of a function, signature is the code before the body.
+        """
+        self.__output.write("%s\n{\n}\n\n" % signature)
 
     def __printScopes(self, scopes, file = stdout):
         scopesToPrint = [scope for scope in scopes if scope.getType() == "class"]
@@ -89,6 +100,33 @@ class CppGenImpl(CppHeaderObserver):
         map(lambda scope:output.write("(" + scope.getType() + ", " + scope.getName() + ")=>"), scopes)
         output.write("\n")
 
+class CppMergeImpl(CppGenImpl):
+    """
+    Collects the stubs of the header instead of writing them, for mergeStubs.
+    """
+    def __init__(self, header):
+        CppGenImpl.__init__(self, header, None)
+        self.__stubs = []
+
+    def getStubs(self):
+        return self.__stubs
+
+    def onPreParse(self, scopes):
+        pass
+
+    def onNamespace(self, scopes, namespace):
+        pass
+
+    def onNamespaceStart(self, scopes, namespace):
+        pass
+
+    def onNamespaceEnd(self, scopes, namespace):
+        pass
+
+    def writeStub(self, scopes, signature):
+        namespaces = [s.getName() for s in scopes if s.getType() == "namespace"]
+        self.__stubs.append((namespaces, signature))
+
 class CppGen(FileGenerator):
     def __init__(self, opts, args):
         FileGenerator.__init__(self, opts, args)
@@ -111,7 +149,14 @@ class CppGen(FileGenerator):
             cppFile = name + suffix
         else:
             raise GetoptError("no cpp file to generate")
-    
+
+        if header != None and path.exists(cppFile) and self.__getOptArg__(("--merge",))[0]:
+            merger = CppMergeImpl(header)
+            CppHeaderModel.getModel(header).render(merger)
+            count = mergeStubs(cppFile, merger.getStubs())
+            print "\t%s\t\t\t\t[MERGED %d]" % (cppFile, count)
+            return
+
         dieOnExists(cppFile)
         FileDepot().add(cppFile)
         parser = TemplateParser("template.cpp", cppFile)
@@ -122,8 +167,4 @@ class CppGen(FileGenerator):
 
     def __generateCppContentFromHeader(self, cppFile, header):
         with open(cppFile, "a+") as output:
-            headerParser = CppHeaderParser(header)
-            cppGenImpl = CppGenImpl(header, output)
-            cppGenImpl.setParser(headerParser)
-            headerParser.addObserver(cppGenImpl)
-            headerParser.parse()
+            CppHeaderModel.getModel(header).render(CppGenImpl(header, output))
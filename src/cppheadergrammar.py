@@ -0,0 +1,335 @@
+# fgen is a free command line tool that facilitates cross platform
+# c++ development, including header generation, cpp file generation,
+# makefile generation, unit test framework generation, etc.
+#
+# Copyright (C) 2006 Kevin Wan <wanjunfeng@gmail.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from pyparsing import *
+import re
+
+__doc__ = \
+"""
+cppheadergrammar module holds the pyparsing grammar used by the "pyparsing" engine of
+CppHeaderParser. The grammar is built only once per process.
+"""
+
+# the leading words that have their own grammars, any other word leads as "ident"
+KEYWORD_LEADERS = ("namespace", "class", "struct", "enum", "template", "virtual",
+        "public", "protected", "private")
+WORD_LEADERS = KEYWORD_LEADERS + ("ident",)
+
+class ContextParser:
+    def __init__(self, parser, statuses=None, leaders=None, requires=None, remainder=True):
+        """
+        Parameters:
+            leaders(tuple): the leaders of the lines that the parser can match, see
+            CppHeaderGrammar.getLeader, None means any line.
+            requires(string): a string that must be in the line for the parser to match.
+            remainder(bool): if the unconsumed remainder of a matched line is to be parsed,
+            False if the parse action consumes the line by itself.
+        """
+        self.__parser = parser
+        self.__parser.streamline()
+        self.__status = statuses if isinstance(statuses, list) else []
+        self.__leaders = leaders
+        self.__requires = requires
+        self.__remainder = remainder
+
+    def getParser(self):
+        return self.__parser
+
+    def getRequires(self):
+        return self.__requires
+
+    def hasRemainder(self):
+        return self.__remainder
+
+    def match(self, ln):
+        """
+        Match the parser at the beginning of the line, and return the location where the
+        match ends, so ln[loc:] is the unconsumed remainder. Return None if the parser
+        doesn't match, no exception is raised since most of the attempts miss.
+        """
+        matched = self.__parser.tryMatch(ln)
+        if matched is None:
+            return None
+        return matched[0]
+
+    def valid(self, status):
+        return [s for s in self.__status if s == "all" or s == status]
+
+    def leads(self, leader):
+        return self.__leaders is None or leader in self.__leaders
+
+class CppHeaderGrammar:
+    """
+    The pyparsing grammar of cpp headers. Building it is expensive, so use getInstance to
+    get the process-wide one. The parse actions are forwarded to the handlers bound by
+    the CppHeaderParser object that is parsing, so the grammar never needs to be rebuilt.
+    """
+    __instance = None
+    __leaderRe = re.compile(r"[A-Za-z_]\w*|\S")
+
+    def getInstance(cls):
+        if not cls.__instance:
+            cls.__instance = cls()
+        return cls.__instance
+    getInstance = classmethod(getInstance)
+
+    def __init__(self):
+        self.__handlers = None
+        self.__dispatch = {}
+
+        # BNF for pyparsing
+        self.__ident = Regex(r"[A-Za-z_]\w*")
+        self.__lparen = Literal("(").suppress()
+        self.__rparen = Literal(")").suppress()
+        self.__unsigned = Keyword("unsigned")
+        self.__int = Keyword("int")
+        self.__short = Keyword("short")
+        self.__long = Keyword("long")
+        self.__double = Keyword("double")
+        self.__float = Keyword("float")
+        self.__char = Keyword("char")
+        self.__wchar_t = Keyword("wchar_t")
+        self.__bool = Keyword("bool")
+        self.__signed = Keyword("signed") 
+        self.__void = Keyword("void") 
+        self.__template = Keyword("template")
+        self.__class = Keyword("class")
+        self.__virtual = Keyword("virtual")
+        self.__static = Keyword("static")
+        self.__operator = Keyword("operator")
+        self.__const = Keyword("const").setResultsName("const")
+        self.__semicolon = Literal(";").setResultsName("semicolon")
+        self.__typename = Keyword("typename")
+        self.__typename = (self.__typename | self.__class)
+        self.__pointerAndRef = ZeroOrMore(Literal("*")) + Optional(Literal("&"))
+        self.__nativeType = OneOrMore((self.__unsigned ^ self.__int ^ self.__short ^ \
+                        self.__long ^ self.__double ^ self.__float ^ self.__char ^ \
+                        self.__wchar_t ^ self.__bool ^ self.__signed ^ self.__void)) \
+                        + self.__pointerAndRef
+        self.__userDefType = delimitedList(self.__ident, "::", combine=True)
+        self.__simpleType = self.__userDefType + Optional("<" + delimitedList(self.__ident) \
+                        + self.__pointerAndRef + ">") + self.__pointerAndRef
+        self.__intermediateType = self.__userDefType + Optional("<" \
+                        + delimitedList(Group(self.__simpleType)) + ">") \
+                        + self.__pointerAndRef
+        self.__complexType = self.__userDefType + Optional("<" \
+                        + delimitedList(Group(self.__intermediateType)) + ">") \
+                        + self.__pointerAndRef
+        self.__type = Group(Optional(self.__const) + (self.__nativeType | self.__complexType))
+        self.__returnType = self.__type.setResultsName("returnType")
+        self.__templateParamList = Group(delimitedList(self.__typename.suppress() \
+                + self.__ident + Optional("=" + self.__type).suppress())) \
+                .setResultsName("templateParamList")
+        # a default value runs to the next comma outside of literals and brackets, '<'
+        # and '>' are operators in it, like in 1 << 2 or a > b
+        self.__bracketed = Forward()
+        self.__initializerPart = quotedString | self.__bracketed | CharsNotIn(",()[]{}\"'")
+        self.__bracketed << ("(" + ZeroOrMore(self.__initializerPart | ",") + ")" \
+                | "[" + ZeroOrMore(self.__initializerPart | ",") + "]" \
+                | "{" + ZeroOrMore(self.__initializerPart | ",") + "}")
+        self.__initializer = OneOrMore(self.__initializerPart)
+        self.__param = Optional(self.__ident) + Optional("=" + self.__initializer).suppress()
+        self.__paramList = Optional(delimitedList(Group(self.__type + self.__param))) \
+                .setResultsName("paramList")
+        self.__templateDecl = Optional(self.__template.suppress() \
+                + Literal("<").suppress() + self.__templateParamList \
+                + Literal(">").suppress())
+        #end BNF
+
+        self.__parsers = [
+             self.__getMacroParser(),
+             self.__getSharpParser(),
+             self.__getAccessModifierParser(),
+             self.__getNamespaceParser(),
+             self.__getClassParser(),
+             self.__getEnumDeclParser(),
+             self.__getOperatorParenParser(),
+             self.__getOperatorParser(),
+             self.__getFunctionParser(),
+             self.__getDtorParser(),
+             self.__getCtorParser(),
+             self.__getStartBraceParser(),
+             self.__getEndBraceParser(),
+             self.__getStatementParser()
+        ]
+
+    def bind(self, handlers):
+        """
+        Bind the handlers that the parse actions are forwarded to, return the ones bound before.
+
+        Parameters:
+            handlers(dict): maps the action names, like "macro" and "function", to callables
+            which take the ParseResults object.
+        """
+        bound = self.__handlers
+        self.__handlers = handlers
+        return bound
+
+    def getLeader(self, ln):
+        """
+        Classify the line by its first token. Return the token itself if it's one of
+        KEYWORD_LEADERS or a punctuation, or "ident" for any other word.
+        """
+        match = self.__leaderRe.match(ln)
+        if not match:
+            return None
+        leader = match.group()
+        if leader[0].isalpha() or leader[0] == "_":
+            return leader if leader in KEYWORD_LEADERS else "ident"
+        return leader
+
+    def getContextParsers(self, ln, status):
+        """
+        Return the parsers that can match the line in the status, in the order to try.
+        """
+        key = (self.getLeader(ln), status)
+        try:
+            return self.__dispatch[key]
+        except KeyError:
+            leader = key[0]
+            parsers = [p for p in self.__parsers if p.valid(status) and p.leads(leader)]
+            self.__dispatch[key] = parsers
+            return parsers
+
+    def __forward(self, name):
+        def action(results):
+            return self.__handlers[name](results)
+        return action
+
+    def __getMacroParser(self):
+        _var = Word(alphanums + "_").setResultsName("macroName")
+        _value = Optional(Regex(r".*")).setResultsName("value")
+        _macroDef = "#" + "define" + _var + _value
+        _macroDef.setName("macroDef")
+        _macroDef.setParseAction(self.__forward("macro"))
+        return ContextParser(_macroDef, ["all"], ("#",))
+
+    def __getSharpParser(self):
+        _lineStartWithSharp = "#" + Regex(r".*")
+        _lineStartWithSharp.setName("lineStartWithSharp")
+        return ContextParser(_lineStartWithSharp, ["all"], ("#",))
+
+    def __getAccessModifierParser(self):
+        _modifier = oneOf("public protected private").setResultsName("modifier")
+        _modifierDef = _modifier + ":"
+        _modifierDef.setName("modifierDef")
+        _modifierDef.setParseAction(self.__forward("accessModifier"))
+        return ContextParser(_modifierDef, ["class"],
+                ("public", "protected", "private"), ":")
+
+    def __getNamespaceParser(self):
+        _namespace = Keyword("namespace")
+        _namespaceName = self.__ident.setResultsName("namespaceName")
+        _namespaceDef = _namespace + Optional(_namespaceName)
+        _namespaceDef.setName("namespaceDef")
+        _namespaceDef.setParseAction(self.__forward("namespace"))
+        return ContextParser(_namespaceDef, ["namespace"], ("namespace",))
+
+    def __getClassParser(self):
+        _class = (Keyword("class") | Keyword("struct")).setResultsName("classOrStruct")
+        _className = self.__ident.setResultsName("className")
+        _classDef = self.__templateDecl + _class + _className
+        _classDef.setName("classDef")
+        _classDef.setParseAction(self.__forward("class"))
+        return ContextParser(_classDef, ["namespace", "class"],
+                ("class", "struct", "template"))
+
+    def __getEnumDeclParser(self):
+        _enumDecl = Keyword("enum").suppress() + \
+                    Optional(self.__ident).setResultsName("enumName")
+        _enumDecl.setName("enumDecl")
+        _enumDecl.setParseAction(self.__forward("enumDecl"))
+        return ContextParser(_enumDecl, ["namespace", "class"], ("enum",), None, False)
+
+    def __getOperatorParenParser(self):
+        _operatorParenDef = self.__templateDecl \
+                + Optional(self.__static).setResultsName("static") \
+                + Optional(self.__virtual).setResultsName("virtual") \
+                + self.__returnType \
+                + Combine(self.__operator + "(" + ")").setResultsName("funcName") \
+                + self.__lparen + self.__paramList + self.__rparen \
+                + Optional(self.__const).setResultsName("const") \
+                + Optional(Literal("=") + Literal("0")).setResultsName("pureVirtual") \
+                + Optional(self.__semicolon)
+        _operatorParenDef.setName("operatorParenDef")
+        _operatorParenDef.setParseAction(self.__forward("function"))
+        return ContextParser(_operatorParenDef, ["namespace", "class"],
+                WORD_LEADERS, "operator")
+
+    def __getOperatorParser(self):
+        _operatorDef = self.__templateDecl \
+                + Optional(self.__static).setResultsName("static") \
+                + Optional(self.__virtual).setResultsName("virtual") \
+                + Optional(self.__returnType + FollowedBy(self.__operator)) \
+                + Combine(self.__operator + SkipTo("(")).setResultsName("funcName") \
+                + self.__lparen + self.__paramList + self.__rparen \
+                + Optional(self.__const).setResultsName("const") \
+                + Optional(Literal("=") + Literal("0")).setResultsName("pureVirtual") \
+                + Optional(self.__semicolon)
+        _operatorDef.setName("operatorDef")
+        _operatorDef.setParseAction(self.__forward("function"))
+        return ContextParser(_operatorDef, ["namespace", "class"],
+                WORD_LEADERS, "operator")
+
+    def __getFunctionParser(self):
+        _functionDef =  self.__templateDecl \
+                + Optional(self.__static).setResultsName("static") \
+                + Optional(self.__virtual).setResultsName("virtual") \
+                + self.__returnType \
+                + self.__ident.setResultsName("funcName") \
+                + self.__lparen + self.__paramList + self.__rparen \
+                + Optional(self.__const).setResultsName("const") \
+                + Optional(Literal("=") + Literal("0")).setResultsName("pureVirtual") \
+                + Optional(self.__semicolon)
+        _functionDef.setName("functionDef")
+        _functionDef.setParseAction(self.__forward("function"))
+        return ContextParser(_functionDef, ["namespace", "class"],
+                WORD_LEADERS, "(")
+
+    def __getDtorParser(self):
+        _dtorDef = Optional(self.__virtual) + Combine("~" + self.__ident).setResultsName("funcName") \
+                + "(" + ")" + Optional(self.__semicolon)
+        _dtorDef.setName("dtorDef")
+        _dtorDef.setParseAction(self.__forward("destructor"))
+        return ContextParser(_dtorDef, ["class"], ("~", "virtual"), "~")
+
+    def __getCtorParser(self):
+        _ctorDef = self.__ident.setResultsName("funcName") + self.__lparen \
+                + self.__paramList + self.__rparen + Optional(self.__semicolon)
+        _ctorDef.setName("ctorDef")
+        _ctorDef.setParseAction(self.__forward("constructor"))
+        return ContextParser(_ctorDef, ["class"], WORD_LEADERS, "(")
+
+    def __getStartBraceParser(self):
+        _startBrace = Optional(SkipTo("{")).setResultsName("skipped") + "{"
+        _startBrace.setName("startBrace")
+        _startBrace.setParseAction(self.__forward("startBrace"))
+        return ContextParser(_startBrace, ["all"], None, "{")
+
+    def __getEndBraceParser(self):
+        _endBrace = Optional(SkipTo("}")).suppress() + "}" + ZeroOrMore(";")
+        _endBrace.setName("endBrace")
+        _endBrace.setParseAction(self.__forward("endBrace"))
+        return ContextParser(_endBrace, ["all"], None, "}")
+
+    def __getStatementParser(self):
+        _statement = Optional(SkipTo(";")).suppress() + ";" # ignore the statements
+        _statement.setName("statement")
+        return ContextParser(_statement, ["all"], None, ";")
@@ -0,0 +1,310 @@
+# fgen is a free command line tool that facilitates cross platform
+# c++ development, including header generation, cpp file generation,
+# makefile generation, unit test framework generation, etc.
+#
+# Copyright (C) 2006 Kevin Wan <wanjunfeng@gmail.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from os import path
+from os import stat
+from cppheaderobserver import CppHeaderObserver
+from cppheaderparser import CppHeaderParser
+
+__doc__ = \
+"""
+cppheadermodel module holds the declaration model of a cpp header. The header is parsed
+once into a list of compact declaration records, in the order of the header, and the
+generators render from the model instead of observing a parser of their own. So
+generating the cpp file, the unit test and the document of one header costs one parse.
+The models of at most MODEL_CACHE_SIZE headers are kept in a process.
+"""
+
+MODEL_CACHE_SIZE = 64
+
+class ScopeRecord(object):
+    """
+    The snapshot of a Scope of CppHeaderParser, with the same getters.
+    """
+    __slots__ = ("__type", "__name", "__access", "__inside")
+
+    def __init__(self, scope):
+        self.__type = scope.getType()
+        self.__name = _intern(scope.getName())
+        self.__access = scope.getAccess()
+        self.__inside = scope.getInside()
+
+    def getType(self):
+        return self.__type
+
+    def getName(self):
+        return self.__name
+
+    def getAccess(self):
+        return self.__access
+
+    def getInside(self):
+        return self.__inside
+
+    def getKey(self):
+        return (self.__type, self.__name, self.__access, self.__inside)
+
+class Declaration(object):
+    """
+    A declaration of the header, or the start or the end of a namespace or a class.
+    kind is one of "macro", "namespace", "namespaceStart", "namespaceEnd", "class",
+    "classStart", "classEnd", "enum", "functionDecl", "functionDef", "ctorDecl",
+    "ctorDef", "dtorDecl" and "dtorDef". The fields that don't apply to the kind are None.
+    """
+    __slots__ = ("kind", "lineno", "scopes", "name", "template", "returnType",
+            "paramList", "const", "members")
+
+    def __init__(self, kind, lineno, scopes, name, template=None, returnType=None,
+            paramList=None, const=None, members=None):
+        self.kind = kind
+        self.lineno = lineno
+        self.scopes = scopes
+        self.name = name
+        self.template = template
+        self.returnType = returnType
+        self.paramList = paramList
+        self.const = const
+        self.members = members
+
+    def fire(self, observer):
+        """
+        Call the method of the observer that the declaration stands for.
+        """
+        scopes = list(self.scopes)
+        kind = self.kind
+        if kind == "functionDecl":
+            observer.onFunctionDecl(scopes, self.template, self.returnType, self.name,
+                    self.paramList, self.const)
+        elif kind == "functionDef":
+            observer.onFunctionDef(scopes, self.template, self.returnType, self.name,
+                    self.paramList, self.const)
+        elif kind == "ctorDecl":
+            observer.onCtorDecl(scopes, self.name, self.paramList)
+        elif kind == "ctorDef":
+            observer.onCtorDef(scopes, self.name, self.paramList)
+        elif kind == "dtorDecl":
+            observer.onDtorDecl(scopes, self.name)
+        elif kind == "dtorDef":
+            observer.onDtorDef(scopes, self.name)
+        elif kind == "class":
+            observer.onClass(scopes, self.template, self.name)
+        elif kind == "classStart":
+            observer.onClassStart(scopes, self.name)
+        elif kind == "classEnd":
+            observer.onClassEnd(scopes, self.name)
+        elif kind == "enum":
+            observer.onEnum(scopes, self.name, self.members)
+        elif kind == "namespace":
+            observer.onNamespace(scopes, self.name)
+        elif kind == "namespaceStart":
+            observer.onNamespaceStart(scopes, self.name)
+        elif kind == "namespaceEnd":
+            observer.onNamespaceEnd(scopes, self.name)
+        elif kind == "macro":
+            observer.onMacro(scopes, self.name)
+
+class CppHeaderModel(CppHeaderObserver):
+    """
+    The declaration model of a header. Use getModel to get the model shared in the
+    process, it's built by observing a CppHeaderParser. Rendering the model to an
+    observer calls its methods as the parser would, and the model answers the calls
+    the observer makes to its parser, like getLineNo and assemblyParamList.
+    """
+    __models = {} # the absolute path of a header => [stamp, model, tick of the last use]
+    __tick = 0
+
+    def getModel(cls, header):
+        """
+        Return the model of the header, which is parsed only if it's not modeled yet in
+        the process or it has changed since. The least recently used model is dropped
+        once there are more than MODEL_CACHE_SIZE of them.
+        """
+        st = stat(header)
+        key = path.abspath(header)
+        stamp = (st.st_mtime, st.st_size)
+        cls.__tick += 1
+        entry = cls.__models.get(key)
+        if entry and entry[0] == stamp:
+            entry[2] = cls.__tick
+            return entry[1]
+        # the model of the old content, if any, is replaced
+        model = cls(header)
+        model.build()
+        cls.__models[key] = [stamp, model, cls.__tick]
+        if len(cls.__models) > MODEL_CACHE_SIZE:
+            models = cls.__models
+            del models[min(models, key=lambda k: models[k][2])]
+        return model
+    getModel = classmethod(getModel)
+
+    def prune(cls):
+        """
+        Forget the models of the headers removed or changed since they're modeled, for a
+        process that outlives the headers, like fgendaemon.
+        """
+        for key, entry in cls.__models.items():
+            try:
+                st = stat(key)
+                if (st.st_mtime, st.st_size) == entry[0]:
+                    continue
+            except OSError:
+                pass
+            del cls.__models[key]
+    prune = classmethod(prune)
+
+    def clear(cls):
+        """
+        Forget the models of all the headers.
+        """
+        cls.__models.clear()
+    clear = classmethod(clear)
+
+    def __init__(self, header):
+        CppHeaderObserver.__init__(self)
+        self.__header = header
+        self.__declarations = []
+        self.__scopes = ()
+        self.__lastScopes = ()
+        self.__current = None
+
+    def build(self):
+        """
+        Parse the header into the model.
+        """
+        parser = CppHeaderParser(self.__header)
+        self.setParser(parser)
+        parser.addObserver(self)
+        parser.parse()
+
+    def getHeader(self):
+        return self.__header
+
+    def getDeclarations(self):
+        return self.__declarations
+
+    def render(self, observer):
+        """
+        Render the model to the observer, whose parser is the model from now on.
+        """
+        observer.setParser(self)
+        self.__current = None
+        observer.onPreParse([])
+        for declaration in self.__declarations:
+            self.__current = declaration
+            declaration.fire(observer)
+        self.__current = None
+        observer.onPostParse(list(self.__scopes))
+
+    def getLineNo(self):
+        return self.__current.lineno if self.__current else -1
+
+    def isPartOfTemplateClass(self):
+        if not self.__current:
+            return []
+        return [x for x in self.__current.scopes if x.getType() == "tclass"]
+
+    def assemblyTemplate(self, seq):
+        return self.__parser__.assemblyTemplate(seq)
+
+    def assemblyType(self, seq):
+        return self.__parser__.assemblyType(seq)
+
+    def assemblyParamList(self, seq):
+        return self.__parser__.assemblyParamList(seq)
+
+    def onPostParse(self, scopes):
+        self.__scopes = self.__snapshot(scopes)
+
+    def onMacro(self, scopes, macro):
+        self.__add("macro", scopes, macro)
+
+    def onNamespace(self, scopes, namespace):
+        self.__add("namespace", scopes, namespace)
+
+    def onNamespaceStart(self, scopes, namespace):
+        self.__add("namespaceStart", scopes, namespace)
+
+    def onNamespaceEnd(self, scopes, namespace):
+        self.__add("namespaceEnd", scopes, namespace)
+
+    def onClass(self, scopes, template, className):
+        self.__add("class", scopes, className, template=_intern(template))
+
+    def onClassStart(self, scopes, className):
+        self.__add("classStart", scopes, className)
+
+    def onClassEnd(self, scopes, className):
+        self.__add("classEnd", scopes, className)
+
+    def onEnum(self, scopes, enumName, enumMembers):
+        self.__add("enum", scopes, enumName, members=_intern(enumMembers))
+
+    def onFunctionDef(self, scopes, template, returnType, funcName, paramList, const):
+        self.__add("functionDef", scopes, funcName, _intern(template), _intern(returnType),
+                _intern(paramList), _intern(const))
+
+    def onFunctionDecl(self, scopes, template, returnType, funcName, paramList, const):
+        self.__add("functionDecl", scopes, funcName, _intern(template), _intern(returnType),
+                _intern(paramList), _intern(const))
+
+    def onDtorDecl(self, scopes, dtorName):
+        self.__add("dtorDecl", scopes, dtorName)
+
+    def onDtorDef(self, scopes, dtorName):
+        self.__add("dtorDef", scopes, dtorName)
+
+    def onCtorDecl(self, scopes, ctorName, paramList):
+        self.__add("ctorDecl", scopes, ctorName, paramList=_intern(paramList))
+
+    def onCtorDef(self, scopes, ctorName, paramList):
+        self.__add("ctorDef", scopes, ctorName, paramList=_intern(paramList))
+
+    def __add(self, kind, scopes, name, *args, **kwargs):
+        self.__declarations.append(Declaration(kind, self.__parser__.getLineNo(),
+                self.__snapshot(scopes), _intern(name), *args, **kwargs))
+
+    def __snapshot(self, scopes):
+        """
+        Return the tuple of ScopeRecord objects of the scopes, the tuple of the previous
+        declaration is shared if the scopes haven't changed since.
+        """
+        last = self.__lastScopes
+        if len(last) == len(scopes):
+            for record, scope in zip(last, scopes):
+                if record.getKey() != (scope.getType(), scope.getName(),
+                        scope.getAccess(), scope.getInside()):
+                    break
+            else:
+                return last
+        self.__lastScopes = tuple([ScopeRecord(scope) for scope in scopes])
+        return self.__lastScopes
+
+def _intern(value):
+    """
+    Intern the strings in the value, the parse results are turned into plain lists.
+    """
+    if isinstance(value, str):
+        return intern(value)
+    if hasattr(value, "asList"):
+        value = value.asList()
+    if isinstance(value, list):
+        return [_intern(item) for item in value]
+    return value
@@ -19,17 +19,48 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 from __future__ import with_statement
-from pyparsing import *
+from os import getenv
+from collections import deque
 from cppheaderobserver import CppHeaderObserver
 from cppheaderparsertracker import CppHeaderParserTracker
+from cpptokenizer import CppTokenizer
+from cpptokenizer import CppStatementRecognizer
+from cpptokenizer import TokenResults
+from cppsource import readHeader
+from cppparsecache import ParseCache
+from cppparsecache import CppHeaderRecorder
+import re
 
 __doc__ = \
 """
 cppheaderparser module is the module that parses cpp header file to get the definition
 of classes, functions etc. You can add a CppHeaderObserver object into CppHeaderParser
 object to observe the events.
+
+Two engines are available. The default "tokenizer" engine tokenizes the header in one
+linear pass and recognizes the statements with a small state machine. The "pyparsing"
+engine tries the pyparsing grammars on each line, it can be selected by passing
+engine="pyparsing" to CppHeaderParser or by setting the FGEN_ENGINE environment variable.
+pyparsing is imported only when the "pyparsing" engine is used and the header is not
+in the parse cache.
+
+With either engine, the bodies of inline functions are skipped up to their matching
+closing braces without recognizing anything in them. The onPreLine and onPostLine
+events of the skipped lines are delivered only to the observers that override them.
+
+The events fired for a header can be cached on disk, see cppparsecache, and replayed
+when the same header is parsed again. The cache is opt-in, it's enabled by passing
+cache=True to CppHeaderParser or by setting the FGEN_CACHE environment variable to "on".
+It's skipped if any observer overrides onPreLine or onPostLine, since the line events
+are not cached.
 """
 
+ENGINES = ("tokenizer", "pyparsing")
+
+# bump it whenever a change of the parser changes the events fired for a header, so
+# that the events cached by the older parser are not replayed
+CACHE_VERSION = 2
+
 class Scope:
     def __init__(self, scopeType, name):
         self.__type = scopeType
@@ -55,114 +86,46 @@ class Scope:
     def getInside(self):
         return self.__inside
 
-class ContextParser:
-    def __init__(self, parser, transformParser, statuses=None):
-        self.__parser = parser
-        self.__transformParser = transformParser
-        self.__status = statuses if isinstance(statuses, list) else []
-
-    def getParser(self):
-        return self.__parser
-
-    def getTransformParser(self):
-        return self.__transformParser
-
-    def valid(self, status):
-        return [s for s in self.__status if s == "all" or s == status]
-
 class CppHeaderParser:
     """
     This class is the cpp header parser class. It uses pyparsing module to convinient the parsing.
     It's an observable class, that means you can add a CppHeaderObserver object to it. And it will
     call your overriden methods from CppHeaderObserver interface.
     """
-    def __init__(self, header):
+    __macroRe = re.compile(r"#\s*define\s+(?P<name>\w+)(?P<value>.*)")
+    __terminatorRe = re.compile(r"""[(){};]|"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?""")
+    __braceRe = re.compile(r"""[{}]|"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?""")
+
+    def __init__(self, header, engine=None, cache=None):
         """
         Construct the CppHeaderParser object.
         
         Parameters:
             header(string): The path of the header file.
+            engine(string): "tokenizer" or "pyparsing", default to the FGEN_ENGINE
+            environment variable, or "tokenizer" if it's not set.
+            cache(bool): if the parse cache is used, default to False unless the
+            FGEN_CACHE environment variable is "on".
         """
         self.__header = header
+        self.__engine = engine if engine else getenv("FGEN_ENGINE", "tokenizer")
+        if self.__engine not in ENGINES:
+            raise ValueError("unknown parser engine %s" % self.__engine)
+        self.__cache = cache if cache is not None else getenv("FGEN_CACHE", "off") == "on"
         self.__observers = [CppHeaderParserTracker()]
+        self.__lineObservers = [] # the observers overriding onPreLine or onPostLine
         self.__lineno = -1
-        self.__lines = []
+        self.__source = None # the lazy (lineno, text) pairs of the header
+        self.__lines = deque() # the lines pulled from the source or pushed back
         self.__currentLine = None
+        self.__joined = None # (offset, lineno) of the lines joined by __nextStatement
         self.__scopes = []
 
-        # BNF for pyparsing
-        self.__ident = Regex(r"[A-Za-z_]\w*")
-        self.__lparen = Literal("(").suppress()
-        self.__rparen = Literal(")").suppress()
-        self.__unsigned = Keyword("unsigned")
-        self.__int = Keyword("int")
-        self.__short = Keyword("short")
-        self.__long = Keyword("long")
-        self.__double = Keyword("double")
-        self.__float = Keyword("float")
-        self.__char = Keyword("char")
-        self.__wchar_t = Keyword("wchar_t")
-        self.__bool = Keyword("bool")
-        self.__signed = Keyword("signed") 
-        self.__void = Keyword("void") 
-        self.__template = Keyword("template")
-        self.__class = Keyword("class")
-        self.__virtual = Keyword("virtual")
-        self.__static = Keyword("static")
-        self.__operator = Keyword("operator")
-        self.__const = Keyword("const").setResultsName("const")
-        self.__semicolon = Literal(";").setResultsName("semicolon")
-        self.__typename = Keyword("typename")
-        self.__typename = (self.__typename | self.__class)
-        self.__pointerAndRef = ZeroOrMore(Literal("*")) + Optional(Literal("&"))
-        self.__nativeType = OneOrMore((self.__unsigned ^ self.__int ^ self.__short ^ \
-                        self.__long ^ self.__double ^ self.__float ^ self.__char ^ \
-                        self.__wchar_t ^ self.__bool ^ self.__signed ^ self.__void)) \
-                        + self.__pointerAndRef
-        self.__userDefType = delimitedList(self.__ident, "::", combine=True)
-        self.__simpleType = self.__userDefType + Optional("<" + delimitedList(self.__ident) \
-                        + self.__pointerAndRef + ">") + self.__pointerAndRef
-        self.__intermediateType = self.__userDefType + Optional("<" \
-                        + delimitedList(Group(self.__simpleType)) + ">") \
-                        + self.__pointerAndRef
-        self.__complexType = self.__userDefType + Optional("<" \
-                        + delimitedList(Group(self.__intermediateType)) + ">") \
-                        + self.__pointerAndRef
-        self.__type = Group(Optional(self.__const) + (self.__nativeType | self.__complexType))
-        self.__returnType = self.__type.setResultsName("returnType")
-        self.__templateParamList = Group(delimitedList(self.__typename.suppress() \
-                + self.__ident + Optional("=" + self.__type).suppress())) \
-                .setResultsName("templateParamList")
-        self.__param = Optional(self.__ident) + Optional("=" + SkipTo(")")).suppress()
-        self.__paramList = Optional(delimitedList(Group(self.__type + self.__param))) \
-                .setResultsName("paramList")
-        self.__templateDecl = Optional(self.__template.suppress() \
-                + Literal("<").suppress() + self.__templateParamList \
-                + Literal(">").suppress())
-        #end BNF
-
-        self.__hasMoreLines = lambda:self.__lines
         self.__getLastScope = lambda:self.__scopes[-1] if self.__scopes else None
         self.__eraseLastScope = lambda:self.__scopes.pop()
         self.__inFuncBody = lambda:[scope for scope in self.__scopes \
                     if scope.getType() == "function" and scope.getInside()]
-        self.__enumParser = self.__getEnumParser()
-        self.__parsers = [
-             self.__getMacroParser(),
-             self.__getSharpParser(),
-             self.__getAccessModifierParser(),
-             self.__getNamespaceParser(),
-             self.__getClassParser(),
-             self.__getEnumDeclParser(),
-             self.__getOperatorParenParser(),
-             self.__getOperatorParser(),
-             self.__getFunctionParser(),
-             self.__getDtorParser(),
-             self.__getCtorParser(),
-             self.__getStartBraceParser(),
-             self.__getEndBraceParser(),
-             self.__getStatementParser()
-        ]
+        self.__grammar = None
 
     def addObserver(self, observer):
         """
@@ -201,35 +164,230 @@ class CppHeaderParser:
         """
         map(lambda ob:ob.onPreParse(self.__scopes), self.__observers)
 
-        self.__parseFile()
+        self.__lineObservers = [ob for ob in self.__observers if self.__asksForLines(ob)]
+        if self.__cache and not self.__lineObservers:
+            cache = ParseCache()
+            key = cache.getKey(self.__header, self.__engine, CACHE_VERSION)
+            entry = cache.load(key)
+            if entry is None:
+                recorder = CppHeaderRecorder()
+                recorder.setParser(self)
+                self.__observers.append(recorder)
+                try:
+                    self.__parseHeader()
+                finally:
+                    self.__observers.remove(recorder)
+                cache.store(key, (recorder.getEvents(), self.__lineno,
+                        self.__snapshotScopes(self.__scopes)))
+            else:
+                events, lineno, scopes = entry
+                self.__replay(events)
+                self.__lineno = lineno
+                self.__scopes = self.__restoreScopes(scopes)
+        else:
+            self.__parseHeader()
+
+        map(lambda ob:ob.onPostParse(self.__scopes), self.__observers)
+
+    def __parseHeader(self):
+        self.__source = readHeader(self.__header)
+        if self.__engine == "tokenizer":
+            self.__parseTokens()
+        else:
+            from cppheadergrammar import CppHeaderGrammar
+            self.__grammar = CppHeaderGrammar.getInstance()
+            bound = self.__grammar.bind({
+                "macro": self.__processMacro,
+                "accessModifier": self.__processAccessModifier,
+                "namespace": self.__processNamespace,
+                "class": self.__processClass,
+                "enumDecl": self.__processEnumDecl,
+                "function": self.__processFunction,
+                "destructor": self.__processDestructor,
+                "constructor": self.__processConstructor,
+                "startBrace": self.__processStartBrace,
+                "endBrace": self.__processEndBrace
+            })
+            try:
+                self.__parseLines()
+            finally:
+                self.__grammar.bind(bound)
+
+    def __replay(self, events):
+        """
+        Fire the events recorded by CppHeaderRecorder, with the line number and the
+        scopes of the moment restored.
+        """
+        for name, lineno, scopes, args in events:
+            self.__lineno = lineno
+            self.__scopes = self.__restoreScopes(scopes)
+            for ob in self.__observers:
+                getattr(ob, name)(self.__scopes, *args)
+
+    def __snapshotScopes(self, scopes):
+        return [(s.getType(), s.getName(), s.getAccess(), s.getInside()) for s in scopes]
+
+    def __restoreScopes(self, snapshot):
+        scopes = []
+        for scopeType, name, access, inside in snapshot:
+            scope = Scope(scopeType, name)
+            scope.setAccess(access)
+            if inside:
+                scope.setInside()
+            scopes.append(scope)
+        return scopes
+
+    def __parseLines(self):
         while self.__hasMoreLines():
-            self.__lineno, ln = self.__nextLine()
+            if self.__skipBody():
+                continue
+            self.__lineno, ln = self.__nextStatement()
             map(lambda ob:ob.onPreLine(self.__scopes, ln), self.__observers)
             if ln:
                 matched = False
-                for contextParser in self.__parsers:
-                    status = self.__getStatus()
-                    if not contextParser.valid(status):
+                for contextParser in self.__grammar.getContextParsers(ln, self.__getStatus()):
+                    requires = contextParser.getRequires()
+                    if requires and requires not in ln:
                         continue
-                    parser = contextParser.getParser()
-                    transformParser = contextParser.getTransformParser()
-                    try:
-                        results = parser.parseString(ln)
-                        if transformParser:
-                            transformParser.setParseAction(replaceWith(""))
-                            remaining = transformParser.transformString(ln)
-                            remaining = remaining.strip()
-                            if remaining:
-                                self.__lines.insert(0, (self.__lineno, remaining))
-                        matched = True
-                        break
-                    except ParseException:
+                    loc = contextParser.match(ln)
+                    if loc is None:
                         continue
+                    if contextParser.hasRemainder():
+                        remaining = ln[loc:].lstrip()
+                        if remaining:
+                            lineno = self.__getLineNoAt(len(ln) - len(remaining))
+                            self.__lines.appendleft((lineno, remaining.rstrip()))
+                    matched = True
+                    break
                 if not matched:
                     self.__concatWithNextLine(ln)
             map(lambda ob:ob.onPostLine(self.__scopes, ln), self.__observers)
 
-        map(lambda ob:ob.onPostParse(self.__scopes), self.__observers)
+    def __parseTokens(self):
+        tokenizer = CppTokenizer()
+        recognizer = CppStatementRecognizer()
+        handlers = {
+            "namespace": self.__processNamespace,
+            "class": self.__processClass,
+            "function": self.__processFunction,
+            "ctor": self.__processConstructor,
+            "dtor": self.__processDestructor,
+            "body": self.__processBody
+        }
+        statement = []
+        statementLine = -1
+        enumResults = None
+        while self.__hasMoreLines():
+            if self.__skipBody():
+                continue
+            self.__lineno, ln = self.__nextLine()
+            lineno = self.__lineno
+            map(lambda ob:ob.onPreLine(self.__scopes, ln), self.__observers)
+            if ln[0] == "#":
+                self.__processDirective(ln)
+                map(lambda ob:ob.onPostLine(self.__scopes, ln), self.__observers)
+                continue
+
+            for token in tokenizer.tokenize(ln):
+                text = token[1]
+                status = self.__getStatus()
+                if status != "namespace" and status != "class":
+                    # inside a function body, only the braces matter
+                    if text == "{":
+                        self.__processStartBrace(None)
+                    elif text == "}":
+                        self.__processEndBrace(None)
+                elif enumResults is not None:
+                    if text == "}":
+                        self.__lineno = statementLine
+                        enumResults.enumVarList = recognizer.recognizeEnumMembers(statement)
+                        self.__processEnumDef(enumResults)
+                        self.__lineno = lineno
+                        enumResults = None
+                        statement = []
+                    else:
+                        statement.append(token)
+                elif text == ";" or text == "{":
+                    self.__lineno = statementLine
+                    scope = self.__getLastScope()
+                    className = scope.getName() if status == "class" else None
+                    recognized = recognizer.recognize(statement, text, status, className)
+                    statement = []
+                    if recognized:
+                        kind, results = recognized
+                        if kind == "enum":
+                            enumResults = results
+                            continue
+                        handlers[kind](results)
+                    self.__lineno = lineno
+                    if text == "{":
+                        self.__processStartBrace(None)
+                elif text == "}":
+                    statement = []
+                    self.__processEndBrace(None)
+                elif text == ":" and status == "class" and len(statement) == 1 \
+                        and statement[0][1] in ("public", "protected", "private"):
+                    self.__processAccessModifier(TokenResults(modifier=statement[0][1]))
+                    statement = []
+                else:
+                    if not statement:
+                        statementLine = lineno
+                    statement.append(token)
+            map(lambda ob:ob.onPostLine(self.__scopes, ln), self.__observers)
+
+    def __skipBody(self):
+        """
+        Skip the lines of the inline function body that the parser is in, up to the
+        matching closing brace, without trying to recognize any statement in them. The
+        braces in string and char literals are not counted. The skipped lines are still
+        delivered to the observers that override onPreLine or onPostLine. Preprocessor
+        lines are left to the parser, so the macros defined in the body are not missed.
+        Return if any line is skipped.
+        """
+        status = self.__getStatus()
+        if (status != "function" and status != "skip") or not self.__inFuncBody():
+            return False
+
+        skipped = False
+        while self.__hasMoreLines() and self.__lines[0][1][0] != "#":
+            self.__lineno, ln = self.__nextLine()
+            skipped = True
+            map(lambda ob:ob.onPreLine(self.__scopes, ln), self.__lineObservers)
+            remaining = None
+            if "{" in ln or "}" in ln:
+                for match in self.__braceRe.finditer(ln):
+                    brace = match.group()
+                    if brace == "{":
+                        self.__processStartBrace(None)
+                    elif brace == "}":
+                        self.__processEndBrace(None)
+                        if not self.__inFuncBody():
+                            remaining = ln[match.end():].lstrip("; \t")
+                            break
+            map(lambda ob:ob.onPostLine(self.__scopes, ln), self.__lineObservers)
+            if remaining is not None:
+                if remaining:
+                    self.__lines.appendleft((self.__lineno, remaining))
+                break
+        return skipped
+
+    def __asksForLines(self, observer):
+        """
+        Return if the observer overrides onPreLine or onPostLine of CppHeaderObserver.
+        """
+        for name in ("onPreLine", "onPostLine"):
+            method = getattr(getattr(observer, name, None), "im_func", None)
+            if method is not getattr(CppHeaderObserver, name).im_func:
+                return True
+        return False
+
+    def __processDirective(self, ln):
+        while ln[-1] == "\\" and self.__hasMoreLines():
+            ln = ln[:-1] + self.__nextLine()[1]
+        match = self.__macroRe.match(ln)
+        if match:
+            self.__processMacro(TokenResults(macroName=match.group("name"),
+                    value=match.group("value").strip()))
 
     def assemblyTemplate(self, seq):
         out = "template <"
@@ -243,7 +401,7 @@ class CppHeaderParser:
     def assemblyType(self, seq):
         out = ""
         for item in seq:
-            if isinstance(item, ParseResults):
+            if not isinstance(item, basestring):
                 sep = ", "
                 if out and out[-1] == "<":
                     sep = ""
@@ -262,202 +420,13 @@ class CppHeaderParser:
         out = ""
         sep = ""
         for item in seq:
-            typeParam = " ".join((self.assemblyType(item[0]), item[1]))
+            typeParam = self.assemblyType(item[0])
+            if len(item) > 1 and item[1]:
+                typeParam = " ".join((typeParam, item[1]))
             out = sep.join((out, typeParam))
             sep = ", "
         return out
 
-    def __getMacroParser(self):
-        _var = Word(alphanums + "_").setResultsName("macroName")
-        _value = Optional(Regex(r".*")).setResultsName("value")
-        _macroDef = "#" + "define" + _var + _value
-        _macroDef.setName("macroDef")
-        _tparser = _macroDef.copy()
-        _macroDef.setParseAction(self.__processMacro)
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_macroDef, _tparser, ["all"])
-
-    def __getSharpParser(self):
-        _lineStartWithSharp = "#" + Regex(r".*")
-        _lineStartWithSharp.setName("lineStartWithSharp")
-        _tparser = _lineStartWithSharp.copy()
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_lineStartWithSharp, _tparser, ["all"])
-
-    def __getAccessModifierParser(self):
-        _modifier = oneOf("public protected private").setResultsName("modifier")
-        _modifierDef = _modifier + ":"
-        _modifierDef.setName("modifierDef")
-        _tparser = _modifierDef.copy()
-        _modifierDef.setParseAction(self.__processAccessModifier)
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_modifierDef, _tparser, ["class"])
-
-    def __getNamespaceParser(self):
-        _namespace = Keyword("namespace")
-        _namespaceName = self.__ident.setResultsName("namespaceName")
-        _namespaceDef = _namespace + Optional(_namespaceName)
-        _namespaceDef.setName("namespaceDef")
-        _tparser = _namespaceDef.copy()
-        _namespaceDef.setParseAction(self.__processNamespace)
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_namespaceDef, _tparser, ["namespace"])
-
-    def __getClassParser(self):
-        _class = (Keyword("class") | Keyword("struct")).setResultsName("classOrStruct")
-        _className = self.__ident.setResultsName("className")
-        _classDef = self.__templateDecl + _class + _className
-        _classDef.setName("classDef")
-        _tparser = _classDef.copy()
-        _classDef.setParseAction(self.__processClass)
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_classDef, _tparser, ["namespace", "class"])
-
-    def __getEnumDeclParser(self):
-        _enumDecl = Keyword("enum").suppress() + \
-                    Optional(self.__ident).setResultsName("enumName")
-        _enumDecl.setName("enumDecl")
-        _enumDecl.setParseAction(self.__processEnumDecl)
-        return ContextParser(_enumDecl, None, ["namespace", "class"])
-
-    def __getOperatorParenParser(self):
-        _operatorParenDef = self.__templateDecl \
-                + Optional(self.__static).setResultsName("static") \
-                + Optional(self.__virtual).setResultsName("virtual") \
-                + self.__returnType \
-                + Combine(self.__operator + "(" + ")").setResultsName("funcName") \
-                + self.__lparen + self.__paramList + self.__rparen \
-                + Optional(self.__const).setResultsName("const") \
-                + Optional(Literal("=") + Literal("0")).setResultsName("pureVirtual") \
-                + Optional(self.__semicolon)
-        _operatorParenDef.setName("operatorParenDef")
-        _tparser = _operatorParenDef.copy()
-        _operatorParenDef.setParseAction(self.__processFunction)
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_operatorParenDef, _tparser, ["namespace", "class"])
-
-    def __getOperatorParser(self):
-        _operatorDef = self.__templateDecl \
-                + Optional(self.__static).setResultsName("static") \
-                + Optional(self.__virtual).setResultsName("virtual") \
-                + Optional(self.__returnType + FollowedBy(self.__operator)) \
-                + Combine(self.__operator + SkipTo("(")).setResultsName("funcName") \
-                + self.__lparen + self.__paramList + self.__rparen \
-                + Optional(self.__const).setResultsName("const") \
-                + Optional(Literal("=") + Literal("0")).setResultsName("pureVirtual") \
-                + Optional(self.__semicolon)
-        _operatorDef.setName("operatorDef")
-        _tparser = _operatorDef.copy()
-        _operatorDef.setParseAction(self.__processFunction)
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_operatorDef, _tparser, ["namespace", "class"])
-
-    def __getFunctionParser(self):
-        _functionDef =  self.__templateDecl \
-                + Optional(self.__static).setResultsName("static") \
-                + Optional(self.__virtual).setResultsName("virtual") \
-                + self.__returnType \
-                + self.__ident.setResultsName("funcName") \
-                + self.__lparen + self.__paramList + self.__rparen \
-                + Optional(self.__const).setResultsName("const") \
-                + Optional(Literal("=") + Literal("0")).setResultsName("pureVirtual") \
-                + Optional(self.__semicolon)
-        _functionDef.setName("functionDef")
-        _tparser = _functionDef.copy()
-        _functionDef.setParseAction(self.__processFunction)
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_functionDef, _tparser, ["namespace", "class"])
-
-    def __getDtorParser(self):
-        _dtorDef = Optional(self.__virtual) + Combine("~" + self.__ident).setResultsName("funcName") \
-                + "(" + ")" + Optional(self.__semicolon)
-        _dtorDef.setName("dtorDef")
-        _tparser = _dtorDef.copy()
-        _dtorDef.setParseAction(self.__processDestructor)
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_dtorDef, _tparser, ["class"])
-
-    def __getCtorParser(self):
-        _ctorDef = self.__ident.setResultsName("funcName") + self.__lparen \
-                + self.__paramList + self.__rparen + Optional(self.__semicolon)
-        _ctorDef.setName("ctorDef")
-        _tparser = _ctorDef.copy()
-        _ctorDef.setParseAction(self.__processConstructor)
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_ctorDef, _tparser, ["class"])
-
-    def __getStartBraceParser(self):
-        _startBrace = Optional(SkipTo("{")).setResultsName("skipped") + "{"
-        _startBrace.setName("startBrace")
-        _tparser = _startBrace.copy()
-        _startBrace.setParseAction(self.__processStartBrace)
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_startBrace, _tparser, ["all"])
-
-    def __getEndBraceParser(self):
-        _endBrace = Optional(SkipTo("}")).suppress() + "}" + ZeroOrMore(";")
-        _endBrace.setName("endBrace")
-        _tparser = _endBrace.copy()
-        _endBrace.setParseAction(self.__processEndBrace)
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_endBrace, _tparser, ["all"])
-
-    def __getStatementParser(self):
-        _statement = Optional(SkipTo(";")).suppress() + ";" # ignore the statements
-        _statement.setName("statement")
-        _tparser = _statement.copy()
-        _tparser.setParseAction(replaceWith(""))
-        return ContextParser(_statement, _tparser, ["all"])
-
-    def __getEnumParser(self):
-        _varDef = self.__ident + Optional(Literal("=") + Regex(r"[^,}]*")).suppress()
-        _varList = delimitedList(_varDef)
-        _enumDef = Keyword("enum").suppress() + \
-                    Optional(self.__ident).setResultsName("enumName") + \
-                    Literal("{").suppress() + \
-                    Group(_varList).setResultsName("enumVarList") + Optional(",") + \
-                    Literal("}").suppress() + \
-                    Literal(";").suppress()
-        _enumDef.setName("enumDef")
-        _enumDef.setParseAction(self.__processEnumDef)
-        return _enumDef
-
-    def __parseFile(self):
-        lnno = 0
-        inComment = False
-        for ln in open(self.__header):
-            lnno += 1
-
-            if inComment:
-                try:
-                    pos = ln.index(r"*/")
-                    ln = ln[pos+2:]
-                    inComment = False
-                except ValueError:
-                    continue
-
-            try:
-                pos = ln.index(r"//")
-                ln = ln[0:pos]
-            except ValueError:
-                pass
-
-            try:
-                pos = ln.index(r"/*")
-                try:
-                    epos = ln.index(r"*/", pos + 2)
-                    ln = " ".join((ln[:pos], ln[epos+2:]))
-                except ValueError:
-                    ln = ln[:pos]
-                    inComment = True
-                    continue
-            except ValueError:
-                pass
-
-            ln = ln.strip()
-            if ln:
-                self.__lines.append((lnno, ln))
-
     def __getStatus(self):
         status = None
         if not self.__scopes:
@@ -505,18 +474,63 @@ class CppHeaderParser:
         self.__scopes.append(scope)
 
     def __processEnumDecl(self, results):
+        """
+        Collect the body of the enum up to its closing brace in one pass, and split the
+        members with CppStatementRecognizer, instead of parsing the growing body again
+        for every line pulled in.
+        """
         lnno, content = self.__currentLine
-        try:
-            self.__enumParser.parseString(content)
-        except ParseException:
-            self.__concatWithNextLine(content)
-            while self.__hasMoreLines():
-                lnno, content = self.__nextLine()
-                try:
-                    self.__enumParser.parseString(content)
-                    break
-                except ParseException:
-                    self.__concatWithNextLine(content)
+        start = content.find("{")
+        if start < 0:
+            # a forward declaration has no members
+            return
+
+        tokenizer = CppTokenizer()
+        recognizer = CppStatementRecognizer()
+        recognized = recognizer.recognize(tokenizer.tokenize(content[:start]), "{",
+                self.__getStatus(), None)
+        if not recognized or recognized[0] != "enum":
+            return
+        enumResults = recognized[1]
+
+        body = []
+        ln = content[start + 1:]
+        lineno = self.__getLineNoAt(start)
+        remaining = None
+        while True:
+            end = self.__findEnumEnd(ln)
+            if end >= 0:
+                body.append(ln[:end])
+                remaining = ln[end + 1:].lstrip("; \t")
+                break
+            body.append(ln)
+            if not self.__hasMoreLines():
+                break
+            lineno, ln = self.__nextLine()
+            if ln[0] == "#":
+                self.__processDirective(ln)
+                ln = ""
+
+        enumResults.enumVarList = recognizer.recognizeEnumMembers(
+                tokenizer.tokenize(" ".join(body)))
+        self.__processEnumDef(enumResults)
+        if remaining:
+            self.__lines.appendleft((lineno, remaining))
+
+    def __findEnumEnd(self, ln):
+        """
+        Return the position of the brace closing the enum body in the line, or -1.
+        """
+        depth = 0
+        for match in self.__braceRe.finditer(ln):
+            brace = match.group()
+            if brace == "{":
+                depth += 1
+            elif brace == "}":
+                if not depth:
+                    return match.start()
+                depth -= 1
+        return -1
 
     def __processEnumDef(self, results):
         enumName = results.enumName
@@ -551,7 +565,11 @@ class CppHeaderParser:
             scopeType = scope.getType()
 
             if scope.getInside():
-                self.__scopes.append(Scope("skip", "unknown"))
+                # a nested brace, the skip scope is inside it at once so that the
+                # braces nested deeper are counted too
+                skip = Scope("skip", "unknown")
+                skip.setInside()
+                self.__scopes.append(skip)
 
             if scopeType == "namespace":
                 if not scope.getInside():
@@ -576,6 +594,9 @@ class CppHeaderParser:
 
             self.__eraseLastScope()
 
+    def __processBody(self, results):
+        self.__scopes.append(Scope("function", results.funcName))
+
     def __processConstructor(self, results):
         if not results.semicolon:
             self.__processCtorDef(results)
@@ -599,13 +620,78 @@ class CppHeaderParser:
         map(lambda ob:ob.onDtorDef(self.__scopes, dtorName), self.__observers)
         self.__scopes.append(Scope("function", dtorName))
 
+    def __hasMoreLines(self):
+        if not self.__lines:
+            for line in self.__source:
+                self.__lines.append(line)
+                break
+        return self.__lines
+
     def __nextLine(self):
-        self.__currentLine = self.__lines.pop(0)
+        if not self.__lines:
+            self.__currentLine = self.__source.next()
+        else:
+            self.__currentLine = self.__lines.popleft()
+        return self.__currentLine
+
+    def __nextStatement(self):
+        """
+        Return the next line joined with the following ones until it holds a statement
+        terminator, so that a declaration spanning several lines is parsed only once.
+        Preprocessor lines are never joined.
+        """
+        lineno, ln = self.__nextLine()
+        self.__joined = None
+        depth = self.__getDepth(ln, 0)
+        if depth != None:
+            parts = [ln]
+            self.__joined = [(0, lineno)]
+            offset = len(ln) + 1
+            while self.__hasMoreLines() and self.__lines[0][1][0] != "#":
+                nextLineno, ln = self.__nextLine()
+                parts.append(ln)
+                self.__joined.append((offset, nextLineno))
+                offset += len(ln) + 1
+                depth = self.__getDepth(ln, depth)
+                if depth == None:
+                    break
+            ln = " ".join(parts)
+            self.__currentLine = (lineno, ln)
         return self.__currentLine
 
+    def __getLineNoAt(self, pos):
+        """
+        Return the number of the line that the position of the current statement is from.
+        """
+        lineno = self.__lineno
+        if self.__joined:
+            for offset, partLineno in self.__joined:
+                if offset > pos:
+                    break
+                lineno = partLineno
+        return lineno
+
+    def __getDepth(self, ln, depth):
+        """
+        Return None if the line ends a statement, i.e. it's a preprocessor line or an access
+        label, or it holds a ';', '{' or '}' outside of the parentheses. Otherwise return
+        the depth of the parentheses after the line, depth is the one after the lines joined
+        before it. The characters in string and char literals don't count.
+        """
+        if ln[0] == "#" or (ln[-1] == ":" and ln[-2:] != "::"):
+            return None
+        for token in self.__terminatorRe.findall(ln):
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+            elif token[0] in ";{}" and depth <= 0:
+                return None
+        return depth
+
     def __concatWithNextLine(self, s):
         if self.__hasMoreLines():
             if s:
                 nextLine = self.__nextLine()[1]
                 ln = " ".join((s, nextLine)).strip()
-                self.__lines.insert(0, (self.__lineno, ln))
+                self.__lines.appendleft((self.__lineno, ln))
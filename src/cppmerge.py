@@ -0,0 +1,435 @@
+# fgen is a free command line tool that facilitates cross platform
+# c++ development, including header generation, cpp file generation,
+# makefile generation, unit test framework generation, etc.
+#
+# Copyright (C) 2006 Kevin Wan <wanjunfeng@gmail.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from __future__ import with_statement
+from cppsource import stripComments
+import re
+from cpptokenizer import CppTokenizer
+from cpptokenizer import IDENT
+from cpptokenizer import splitList
+
+__doc__ = \
+"""
+cppmerge module merges the stubs generated from a header into an existing cpp file.
+The cpp file is scanned once into a CppSourceIndex, which keys the functions defined
+in it by their qualified names and signatures, so only the stubs of the declarations
+without a definition are inserted, into the namespace blocks they belong to. The file
+is rewritten in a single write.
+
+The tests generated from a header are merged into an existing cppunit test file the
+same way, the test file is scanned once into a CppTestIndex of its test suites.
+"""
+
+_tokenizer = CppTokenizer()
+
+# the words ending a parameter type, which are not parameter names
+_typeWords = frozenset(("void", "bool", "char", "wchar_t", "short", "int", "long",
+        "float", "double", "signed", "unsigned", "const", "volatile"))
+
+def getDefinitionKey(tokens):
+    """
+    Return the (name, params, const) key of the function defined by the tokens of the
+    statement before its body, or None if it's not a function definition. The name is
+    qualified as written, the params are the types of the parameters without the names.
+    Both are joined without spaces, so the formatting of the code doesn't matter.
+    """
+    texts = [t[1] for t in tokens]
+    if texts[:2] == ["template", "<"]:
+        depth = 0
+        for pos, text in enumerate(texts):
+            if text == "<":
+                depth += 1
+            elif text == ">":
+                depth -= 1
+                if not depth:
+                    break
+        tokens = tokens[pos + 1:]
+        texts = texts[pos + 1:]
+
+    if "operator" in texts:
+        start = texts.index("operator")
+        paren = start + 1
+        if texts[paren:paren + 2] == ["(", ")"]:
+            paren += 2
+        while paren < len(texts) and texts[paren] != "(":
+            paren += 1
+    elif "(" in texts:
+        paren = texts.index("(")
+        start = paren - 1
+        if start < 0 or tokens[start][0] != IDENT:
+            return None
+        if start > 0 and texts[start - 1] == "~":
+            start -= 1
+    else:
+        return None
+    while start >= 2 and texts[start - 1] == "::" and tokens[start - 2][0] == IDENT:
+        start -= 2
+
+    close = _findClose(texts, paren)
+    if close < 0:
+        return None
+    trailer = texts[close + 1:]
+    if ":" in trailer:
+        # the initializer list of a constructor
+        trailer = trailer[:trailer.index(":")]
+    return ("".join(texts[start:paren]), _getParamTypes(tokens[paren + 1:close]),
+            "const" in trailer)
+
+def _findClose(texts, pos):
+    depth = 0
+    for i in xrange(pos, len(texts)):
+        if texts[i] == "(":
+            depth += 1
+        elif texts[i] == ")":
+            depth -= 1
+            if not depth:
+                return i
+    return -1
+
+def _getParamTypes(tokens):
+    params = []
+    for chunk in splitList(tokens):
+        texts = [t[1] for t in chunk]
+        if "=" in texts:
+            chunk = chunk[:texts.index("=")]
+        if len(chunk) > 1 and chunk[-1][0] == IDENT and chunk[-2][1] != "::" \
+                and chunk[-1][1] not in _typeWords:
+            chunk = chunk[:-1]
+        params.append("".join([t[1] for t in chunk]))
+    if params == [""] or params == ["void"]:
+        return ()
+    return tuple(params)
+
+class CppSourceIndex:
+    """
+    The index of the functions defined in a cpp file, and of the lines closing its
+    namespace blocks.
+    """
+    def __init__(self, lines):
+        """
+        Scan the lines of the cpp file, the function bodies are skipped by counting
+        braces, so the scan is linear in the size of the file.
+        """
+        self.__keys = set()
+        self.__namespaceEnds = {}
+        self.__scan(lines)
+
+    def hasDefinition(self, namespaces, key):
+        """
+        Return if the function of the key, declared in the nested namespaces, is defined.
+        The definition may be qualified by the namespaces, be in their blocks, or be
+        after a using directive or declaration of them, see __addDefinition.
+        """
+        if not key:
+            return False
+        name, params, const = key
+        return ("::".join(list(namespaces) + [name]), params, const) in self.__keys
+
+    def getNamespaceEnd(self, namespaces):
+        """
+        Return the line number of the line closing the last block of the nested
+        namespaces, or None if there is no such block.
+        """
+        return self.__namespaceEnds.get(tuple(namespaces))
+
+    def __scan(self, lines):
+        tokenize = _tokenizer.tokenize
+        namespaces = []
+        blocks = [] # the namespace names, or None for the other blocks
+        usings = [] # (the number of the blocks it's in, its namespaces, the kind, the name)
+        depth = 0 # the depth of the braces in a function body or a class
+        statement = []
+        for lineno, line in stripComments(lines):
+            if line.startswith("#"):
+                continue
+            for token in tokenize(line):
+                text = token[1]
+                if depth:
+                    if text == "{":
+                        depth += 1
+                    elif text == "}":
+                        depth -= 1
+                elif text == "{":
+                    if statement and statement[0][1] == "namespace":
+                        name = statement[1][1] if len(statement) > 1 else ""
+                        namespaces.append(name)
+                        blocks.append(name)
+                    elif statement and statement[0][1] == "extern":
+                        # extern "C" { ... } holds definitions as a namespace does
+                        blocks.append(None)
+                    else:
+                        self.__addDefinition(namespaces, usings, statement)
+                        depth = 1
+                    statement = []
+                elif text == "}":
+                    if blocks and blocks.pop() != None:
+                        self.__namespaceEnds[tuple(namespaces)] = lineno
+                        namespaces.pop()
+                    # the using directives and declarations end with their blocks
+                    while usings and usings[-1][0] > len(blocks):
+                        usings.pop()
+                    statement = []
+                elif text == ";":
+                    texts = [t[1] for t in statement]
+                    if texts[:2] == ["using", "namespace"]:
+                        usings.append((len(blocks), list(namespaces), "namespace",
+                                "".join(texts[2:])))
+                    elif texts[:1] == ["using"]:
+                        texts = [x for x in texts[1:] if x != "typename"]
+                        usings.append((len(blocks), list(namespaces), "name", "".join(texts)))
+                    statement = []
+                else:
+                    statement.append(token)
+
+    def __addDefinition(self, namespaces, usings, statement):
+        """
+        Add the key of the function defined by the statement, the name is qualified by
+        the namespace blocks it's in. A name that can also be looked up through a using
+        directive or declaration in effect, like Foo::bar after using namespace a or
+        using a::Foo, is added qualified that way as well.
+        """
+        key = getDefinitionKey(statement) if statement else None
+        if not key:
+            return
+        name, params, const = key
+        names = ["::".join(namespaces + [name])]
+        first = name.split("::")[0]
+        for level, outer, kind, used in usings:
+            if kind == "namespace":
+                qualified = "%s::%s" % (used, name)
+            elif used == first or used.endswith("::" + first):
+                qualified = used[:len(used) - len(first)] + name
+            else:
+                continue
+            if qualified.startswith("::"):
+                names.append(qualified[2:])
+            else:
+                # the used name is relative to the namespaces of the using, or at the top
+                names.append(qualified)
+                names.append("::".join(outer + [qualified]))
+        for qualified in names:
+            self.__keys.add((qualified, params, const))
+
+def mergeStubs(cppFile, stubs):
+    """
+    Insert the stubs of the functions not defined in the cpp file, return the number of
+    the stubs inserted.
+
+    Parameters:
+        cppFile(string): the path of the cpp file.
+        stubs(list): the (namespaces, signature) tuples of the stubs in the order of the
+        header, the signature is the code before the body of the function.
+    """
+    with open(cppFile) as f:
+        lines = f.readlines()
+    index = CppSourceIndex(lines)
+    tokenize = _tokenizer.tokenize
+
+    inserts = {} # line number => the stubs inserted before the line
+    appends = [] # [namespaces, stubs] of the namespace blocks appended to the file
+    count = 0
+    for namespaces, signature in stubs:
+        tokens = tokenize(signature.replace("\n", " "))
+        if index.hasDefinition(namespaces, getDefinitionKey(tokens)):
+            continue
+        count += 1
+        stub = "%s\n{\n}\n\n" % signature
+        end = index.getNamespaceEnd(namespaces)
+        if end != None:
+            inserts.setdefault(end, []).append(stub)
+        elif appends and appends[-1][0] == namespaces:
+            appends[-1][1].append(stub)
+        else:
+            appends.append([namespaces, [stub]])
+    if not count:
+        return 0
+
+    tail = inserts.setdefault(len(lines) + 1, [])
+    for namespaces, block in appends:
+        tail.append("\n")
+        tail.extend(["namespace %s\n{\n\n" % name for name in namespaces])
+        tail.extend(block)
+        tail.extend(["}\n" for name in namespaces])
+    with open(cppFile, "w") as f:
+        f.write("".join(insertLines(lines, inserts)))
+    return count
+
+def insertLines(lines, inserts):
+    """
+    Return the lines with the texts inserted.
+
+    Parameters:
+        lines(list): the lines of a file.
+        inserts(dict): line number => the texts inserted before the line, the texts of
+        the line number after the last line are appended.
+    """
+    out = []
+    for lineno, line in enumerate(lines):
+        if lineno + 1 in inserts:
+            out.extend(inserts[lineno + 1])
+        out.append(line)
+    if out and not out[-1].endswith("\n"):
+        out.append("\n")
+    out.extend(inserts.get(len(lines) + 1, []))
+    return out
+
+def mergeTests(testFile, testClasses):
+    """
+    Merge the tests into the cppunit test file, return the number of the tests merged.
+    The registrations, the declarations and the failing stubs missing from the test
+    classes are inserted into them, the missing test classes are appended whole.
+
+    Parameters:
+        testFile(string): the path of the test file.
+        testClasses(list): the (name, tests, text) tuples of the test classes, in which
+        tests are the (function, registration, declaration, stub) tuples of the tests,
+        and text is the whole class for appending.
+    """
+    with open(testFile) as f:
+        lines = f.readlines()
+    index = CppTestIndex(lines)
+
+    inserts = {}
+    appends = []
+    count = 0
+    for name, tests, text in testClasses:
+        suite = index.getSuite(name)
+        if suite is None:
+            appends.append(text)
+            count += len(tests)
+            continue
+        stubEnd = suite.lastDefinitionEnd
+        if stubEnd is None:
+            stubEnd = suite.classEnd
+        for func, registration, declaration, stub in tests:
+            merged = False
+            if func not in suite.tests:
+                inserts.setdefault(suite.suiteEnd, []).append(registration)
+                merged = True
+            if func not in suite.declared:
+                inserts.setdefault(suite.classEnd, []).append(declaration)
+                merged = True
+            if func not in suite.defined:
+                inserts.setdefault(stubEnd + 1, []).append("\n" + stub)
+                merged = True
+            count += merged
+    if not count:
+        return 0
+
+    if appends:
+        tail = inserts.setdefault(len(lines) + 1, [])
+        if lines and lines[-1].strip():
+            tail.append("\n")
+        tail.extend(appends)
+    with open(testFile, "w") as f:
+        f.write("".join(insertLines(lines, inserts)))
+    return count
+
+class TestSuiteInfo:
+    """
+    What a test file has of a test class with a CPPUNIT_TEST_SUITE. The line numbers
+    are those of the CPPUNIT_TEST_SUITE_END line, of the line closing the class, and of
+    the line closing the last member function defined out of the class, or None.
+    """
+    def __init__(self):
+        self.tests = set()
+        self.declared = set()
+        self.defined = set()
+        self.suiteEnd = None
+        self.classEnd = None
+        self.lastDefinitionEnd = None
+
+class CppTestIndex:
+    """
+    The index of the test classes of a cppunit test file, scanned line by line in one
+    pass.
+    """
+    __literalRe = re.compile(r""""(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'""")
+    __classRe = re.compile(r"^(?:class|struct)\s+(\w+)")
+    __definitionRe = re.compile(r"\b(\w+)::(\w+)\s*\(\s*(?:void)?\s*\)")
+    __suiteEndRe = re.compile(r"\bCPPUNIT_TEST_SUITE_END\b")
+    __testRe = re.compile(r"\bCPPUNIT_TEST(?:_EXCEPTION|_FAIL)?\s*\(\s*(\w+)")
+    __declarationRe = re.compile(r"\b(\w+)\s*\(\s*(?:void)?\s*\)")
+
+    def __init__(self, lines):
+        self.__classes = {}
+        self.__scan(lines)
+
+    def getSuite(self, className):
+        """
+        Return the TestSuiteInfo of the class, or None if it has no test suite.
+        """
+        suite = self.__classes.get(className)
+        if suite and suite.suiteEnd != None and suite.classEnd != None:
+            return suite
+        return None
+
+    def __getInfo(self, className):
+        if className not in self.__classes:
+            self.__classes[className] = TestSuiteInfo()
+        return self.__classes[className]
+
+    def __scan(self, lines):
+        depth = 0
+        pending = None # the ("class" or "definition", class name) before its brace
+        block = None # the same of the block at depth 0
+        for lineno, text in stripComments(lines):
+            if text.startswith("#"):
+                continue
+            text = self.__literalRe.sub('""', text)
+            if not depth:
+                match = self.__classRe.match(text)
+                if match:
+                    pending = ("class", match.group(1))
+                else:
+                    match = self.__definitionRe.search(text)
+                    if match:
+                        pending = ("definition", match.group(1))
+                        self.__getInfo(match.group(1)).defined.add(match.group(2))
+            elif depth == 1 and block and block[0] == "class":
+                info = self.__getInfo(block[1])
+                match = self.__testRe.search(text)
+                if match:
+                    info.tests.add(match.group(1))
+                elif self.__suiteEndRe.search(text):
+                    info.suiteEnd = lineno
+                else:
+                    names = self.__declarationRe.findall(text)
+                    info.declared.update(names)
+                    if names and "{" in text:
+                        info.defined.update(names)
+
+            opened = text.count("{")
+            if not depth and opened and pending:
+                block = pending
+                pending = None
+            elif not depth and ";" in text and not opened:
+                # a declaration, not the head of a block
+                pending = None
+            depth += opened - text.count("}")
+            if depth <= 0:
+                depth = 0
+                if block and (opened or "}" in text):
+                    info = self.__getInfo(block[1])
+                    if block[0] == "class":
+                        info.classEnd = lineno
+                    else:
+                        info.lastDefinitionEnd = lineno
+                    block = None
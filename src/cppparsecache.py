@@ -0,0 +1,225 @@
+# fgen is a free command line tool that facilitates cross platform
+# c++ development, including header generation, cpp file generation,
+# makefile generation, unit test framework generation, etc.
+#
+# Copyright (C) 2006 Kevin Wan <wanjunfeng@gmail.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from __future__ import with_statement
+from os import fdopen
+from os import getenv
+from os import getuid
+from os import listdir
+from os import makedirs
+from os import path
+from os import remove
+from os import rename
+from os import stat
+from stat import S_IWGRP
+from stat import S_IWOTH
+from os import utime
+from tempfile import mkstemp
+from cppheaderobserver import CppHeaderObserver
+import cPickle
+import hashlib
+
+__doc__ = \
+"""
+cppparsecache module caches the events that CppHeaderParser fires for a header, so that
+parsing the same unchanged header again only replays the events to the observers. The
+entries are kept under ~/.fgen/cache, keyed by the hash of the header content, the
+parser engine and the cache version of the parser. The least recently used entries are
+evicted once the cache grows over CACHE_SIZE bytes.
+
+Loading an entry unpickles it, which can run code of whoever wrote the entry. So the
+cache is created private to the user, and it's not used at all if the directory is
+owned by someone else or writable by the group or the others.
+"""
+
+CACHE_SIZE = 64 * 1024 * 1024
+
+class ParseCache:
+    """
+    The on-disk cache of the parse events, an entry is a pickled object of any kind.
+    """
+    def __init__(self, directory=None, maxSize=CACHE_SIZE):
+        """
+        Parameters:
+            directory(string): the cache directory, default to ~/.fgen/cache.
+            maxSize(int): the size in bytes that the cache is evicted down to.
+        """
+        if not directory:
+            directory = path.join(getenv("HOME", ""), ".fgen", "cache")
+        self.__directory = directory
+        self.__maxSize = maxSize
+
+    def getKey(self, header, *salts):
+        """
+        Return the key of the header, i.e. the hash of its content and the salts.
+        """
+        digest = hashlib.sha1()
+        for salt in salts:
+            digest.update("%s\0" % salt)
+        with open(header, "rb") as f:
+            while True:
+                chunk = f.read(1024 * 1024)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def load(self, key):
+        """
+        Return the entry of the key, or None if it's not cached. An entry that can't be
+        loaded is removed, so that the header is parsed and cached again.
+        """
+        if not self.__isPrivate():
+            return None
+        entryPath = self.__getPath(key)
+        try:
+            f = open(entryPath, "rb")
+        except IOError:
+            return None
+        try:
+            try:
+                entry = cPickle.load(f)
+            finally:
+                f.close()
+            # the access time is not reliable on noatime mounts, mark the use on mtime
+            utime(entryPath, None)
+            return entry
+        except Exception:
+            # a truncated or corrupt pickle raises almost anything
+            try:
+                remove(entryPath)
+            except OSError:
+                pass
+            return None
+
+    def store(self, key, entry):
+        """
+        Store the entry of the key, and evict the least recently used entries if the
+        cache is over its size. A cache that can't be written, or an entry that can't be
+        pickled, is silently skipped.
+        """
+        try:
+            if not path.isdir(self.__directory):
+                makedirs(self.__directory, 0700)
+            if not self.__isPrivate():
+                return
+            fd, tmpPath = mkstemp(".tmp", "", self.__directory)
+        except (IOError, OSError):
+            return
+        try:
+            try:
+                with fdopen(fd, "wb") as f:
+                    cPickle.dump(entry, f, cPickle.HIGHEST_PROTOCOL)
+                rename(tmpPath, self.__getPath(key))
+                self.__evict()
+            except (IOError, OSError, cPickle.PicklingError, TypeError):
+                pass
+        finally:
+            if path.exists(tmpPath):
+                try:
+                    remove(tmpPath)
+                except OSError:
+                    pass
+
+    def __isPrivate(self):
+        try:
+            st = stat(self.__directory)
+        except OSError:
+            return False
+        return st.st_uid == getuid() and not st.st_mode & (S_IWGRP | S_IWOTH)
+
+    def __evict(self):
+        entries = []
+        total = 0
+        for name in listdir(self.__directory):
+            if not name.endswith(".pickle"):
+                continue
+            st = stat(path.join(self.__directory, name))
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        entries.sort()
+        for mtime, size, name in entries:
+            if total <= self.__maxSize:
+                break
+            remove(path.join(self.__directory, name))
+            total -= size
+
+    def __getPath(self, key):
+        return path.join(self.__directory, key + ".pickle")
+
+class CppHeaderRecorder(CppHeaderObserver):
+    """
+    The observer that records the events of CppHeaderParser with the line number and the
+    scopes of the moment, so that they can be cached and replayed. The parse results are
+    stored as they are, so that the replayed events carry the same types as the parsed ones.
+    """
+    def __init__(self):
+        CppHeaderObserver.__init__(self)
+        self.__events = []
+
+    def getEvents(self):
+        return self.__events
+
+    def onMacro(self, scopes, macro):
+        self.__record("onMacro", scopes, macro)
+
+    def onNamespace(self, scopes, namespace):
+        self.__record("onNamespace", scopes, namespace)
+
+    def onNamespaceStart(self, scopes, namespace):
+        self.__record("onNamespaceStart", scopes, namespace)
+
+    def onNamespaceEnd(self, scopes, namespace):
+        self.__record("onNamespaceEnd", scopes, namespace)
+
+    def onClass(self, scopes, template, className):
+        self.__record("onClass", scopes, template, className)
+
+    def onClassStart(self, scopes, className):
+        self.__record("onClassStart", scopes, className)
+
+    def onClassEnd(self, scopes, className):
+        self.__record("onClassEnd", scopes, className)
+
+    def onEnum(self, scopes, enumName, enumMembers):
+        self.__record("onEnum", scopes, enumName, enumMembers)
+
+    def onFunctionDef(self, scopes, template, returnType, funcName, paramList, const):
+        self.__record("onFunctionDef", scopes, template, returnType, funcName, paramList, const)
+
+    def onFunctionDecl(self, scopes, template, returnType, funcName, paramList, const):
+        self.__record("onFunctionDecl", scopes, template, returnType, funcName, paramList, const)
+
+    def onDtorDecl(self, scopes, dtorName):
+        self.__record("onDtorDecl", scopes, dtorName)
+
+    def onDtorDef(self, scopes, dtorName):
+        self.__record("onDtorDef", scopes, dtorName)
+
+    def onCtorDecl(self, scopes, ctorName, paramList):
+        self.__record("onCtorDecl", scopes, ctorName, paramList)
+
+    def onCtorDef(self, scopes, ctorName, paramList):
+        self.__record("onCtorDef", scopes, ctorName, paramList)
+
+    def __record(self, name, scopes, *args):
+        scopes = [(s.getType(), s.getName(), s.getAccess(), s.getInside()) for s in scopes]
+        self.__events.append((name, self.__parser__.getLineNo(), scopes, list(args)))
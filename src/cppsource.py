@@ -0,0 +1,165 @@
+# fgen is a free command line tool that facilitates cross platform
+# c++ development, including header generation, cpp file generation,
+# makefile generation, unit test framework generation, etc.
+#
+# Copyright (C) 2006 Kevin Wan <wanjunfeng@gmail.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from __future__ import with_statement
+from os import fstat
+import mmap
+import re
+
+__doc__ = \
+"""
+cppsource module reads the source lines of a cpp header for CppHeaderParser. The lines
+are streamed lazily as (lineno, text) pairs with the comments stripped, so the parsing
+begins before the whole header is read and the memory stays flat. Headers of
+MAPPED_SIZE bytes or more are memory mapped instead of being read line by line.
+"""
+
+MAPPED_SIZE = 16 * 1024 * 1024
+
+_specialRe = re.compile(r"""//|/\*|"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?""")
+_mappedRe = re.compile(r"""
+        //[^\n]*
+      | /\*[^*]*\*+(?:[^/*][^*]*\*+)*/ | /\*.*
+      | "[^"\\\n]*(?:\\[^\n][^"\\\n]*)*"? | '[^'\\\n]*(?:\\[^\n][^'\\\n]*)*'?
+        """, re.DOTALL | re.VERBOSE)
+
+def stripComments(lines):
+    """
+    Strip the comments from the lines, and yield the (lineno, text) pairs of the lines
+    that are not empty after stripping. The text is stripped of the leading and trailing
+    white spaces. The comment markers in string and char literals are kept.
+
+    Parameters:
+        lines(iterable): the lines of the header.
+    """
+    specialRe = _specialRe
+    inComment = False
+    lineno = 0
+    for ln in lines:
+        lineno += 1
+        pos = 0
+        if inComment:
+            pos = ln.find("*/")
+            if pos < 0:
+                continue
+            pos += 2
+            inComment = False
+        elif "/" not in ln:
+            ln = ln.strip()
+            if ln:
+                yield lineno, ln
+            continue
+
+        parts = []
+        while True:
+            match = specialRe.search(ln, pos)
+            if not match:
+                parts.append(ln[pos:])
+                break
+            start = match.start()
+            token = match.group()
+            if token == "//":
+                parts.append(ln[pos:start])
+                break
+            elif token == "/*":
+                parts.append(ln[pos:start])
+                end = ln.find("*/", start + 2)
+                if end < 0:
+                    inComment = True
+                    break
+                parts.append(" ")
+                pos = end + 2
+            else:
+                parts.append(ln[pos:match.end()])
+                pos = match.end()
+        ln = "".join(parts).strip()
+        if ln:
+            yield lineno, ln
+
+def stripMapped(buf):
+    """
+    The same as stripComments, but works on a buffer like a mmap object. Only the
+    comments and the literals are matched by a regular expression over the whole
+    buffer, the code between them is copied out of the buffer in one slice and split
+    into lines.
+
+    Parameters:
+        buf(buffer): the content of the header.
+    """
+    lineno = 1
+    parts = []
+    pos = 0
+    for match in _mappedRe.finditer(buf):
+        start = match.start()
+        first = buf[start]
+        if first == '"' or first == "'":
+            # the literal stays in the code, only its comment markers are skipped
+            continue
+        lines = buf[pos:start].split("\n")
+        parts.append(lines[0])
+        if len(lines) > 1:
+            ln = "".join(parts).strip()
+            if ln:
+                yield lineno, ln
+            for ln in lines[1:-1]:
+                lineno += 1
+                ln = ln.strip()
+                if ln:
+                    yield lineno, ln
+            lineno += 1
+            parts = [lines[-1]]
+        pos = match.end()
+        if buf[start + 1] == "*":
+            count = match.group().count("\n")
+            if count:
+                ln = "".join(parts).strip()
+                if ln:
+                    yield lineno, ln
+                parts = []
+                lineno += count
+            else:
+                parts.append(" ")
+
+    lines = buf[pos:].split("\n")
+    parts.append(lines[0])
+    ln = "".join(parts).strip()
+    if ln:
+        yield lineno, ln
+    for ln in lines[1:]:
+        lineno += 1
+        ln = ln.strip()
+        if ln:
+            yield lineno, ln
+
+def readHeader(header):
+    """
+    Yield the (lineno, text) pairs of the header file, see stripComments.
+    """
+    with open(header, "rb") as lines:
+        if fstat(lines.fileno()).st_size >= MAPPED_SIZE:
+            buf = mmap.mmap(lines.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for line in stripMapped(buf):
+                    yield line
+            finally:
+                buf.close()
+        else:
+            for line in stripComments(lines):
+                yield line
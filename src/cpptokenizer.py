@@ -0,0 +1,369 @@
+# fgen is a free command line tool that facilitates cross platform
+# c++ development, including header generation, cpp file generation,
+# makefile generation, unit test framework generation, etc.
+#
+# Copyright (C) 2006 Kevin Wan <wanjunfeng@gmail.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import re
+
+__doc__ = \
+"""
+cpptokenizer module splits the lines of a cpp header into tokens in one linear pass,
+and recognizes the statements built from those tokens. It is the engine behind the
+default "tokenizer" mode of CppHeaderParser.
+"""
+
+IDENT = "ident"
+NUMBER = "number"
+LITERAL = "literal"
+PUNCT = "punct"
+
+def splitList(tokens, templates=True):
+    """
+    Split the tokens of a list, like the parameters of a function, by the commas outside
+    of any bracket. A '<' is a bracket only after an identifier, i.e. it opens the
+    argument list of a template name, and never in a default value or an initializer,
+    where '<' and '>' are operators like in 1 << 2 or a > b. If templates is False, '<'
+    is never a bracket.
+    """
+    chunks = [[]]
+    depth = 0
+    angle = 0
+    initializer = False
+    prev = None
+    for token in tokens:
+        kind, text = token
+        if text in ("(", "[", "{"):
+            depth += 1
+        elif text in (")", "]", "}"):
+            depth -= 1
+        elif depth:
+            pass
+        elif text == "<" and templates and prev == IDENT and not initializer:
+            angle += 1
+        elif text == ">" and angle:
+            angle -= 1
+        elif text == "=" and not angle:
+            initializer = True
+        elif text == "," and not angle:
+            chunks.append([])
+            initializer = False
+            prev = None
+            continue
+        chunks[-1].append(token)
+        prev = kind
+    return chunks
+
+class TokenResults:
+    """
+    The results of a recognized statement. It mimics the attribute access of
+    pyparsing.ParseResults, so that a missing name is an empty string.
+    """
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return ""
+
+class CppTokenizer:
+    """
+    This class splits a line, with comments already stripped, into (kind, text) tokens.
+    """
+    __tokenRe = re.compile(r"""
+            (?P<ident>[A-Za-z_]\w*)
+          | (?P<number>\.?\d(?:[\w.]|[eEpP][-+])*)
+          | (?P<literal>"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?)
+          | (?P<punct>::|\.\.\.|\S)
+            """, re.VERBOSE)
+
+    def tokenize(self, line):
+        return [(m.lastgroup, m.group()) for m in self.__tokenRe.finditer(line)]
+
+class CppStatementRecognizer:
+    """
+    This class recognizes a statement, i.e. the tokens before a ';' or a '{', and returns
+    a (kind, results) tuple, in which kind is one of "namespace", "class", "enum",
+    "function", "ctor", "dtor" and "body", or None if the statement means nothing to
+    the observers.
+    """
+    __specifiers = frozenset(("static", "virtual", "inline", "explicit", "extern", "constexpr"))
+    __skipped = frozenset(("typedef", "using", "friend", "return", "throw", "delete", "new"))
+    __keywords = frozenset(("void", "bool", "char", "wchar_t", "short", "int", "long",
+            "float", "double", "signed", "unsigned", "const", "volatile", "struct", "class",
+            "union", "enum", "typename", "template", "namespace", "operator", "sizeof",
+            "if", "else", "for", "while", "do", "switch", "case", "default", "return",
+            "public", "protected", "private", "typedef", "using", "friend"))
+    __qualifiers = frozenset(("const", "volatile", "struct", "class", "union", "enum", "typename"))
+    __typePuncts = frozenset(("::", "<", ">", ",", "*", "&"))
+
+    def recognize(self, tokens, terminator, status, className):
+        """
+        Recognize the statement.
+
+        Parameters:
+            tokens(list): the (kind, text) tokens of the statement.
+            terminator(string): ';' or '{'.
+            status(string): "namespace" or "class", the status of the parser.
+            className(string): the name of the enclosing class if status is "class".
+        """
+        if not tokens:
+            return None
+
+        first = tokens[0][1]
+        if first == "namespace":
+            if terminator == "{" and status == "namespace":
+                name = tokens[1][1] if len(tokens) > 1 and tokens[1][0] == IDENT else ""
+                return ("namespace", TokenResults(namespaceName=name))
+            return None
+        if first in self.__skipped:
+            return None
+
+        template, tokens = self.__splitTemplate(tokens)
+        if not tokens:
+            return None
+
+        first = tokens[0][1]
+        if first == "class" or first == "struct":
+            if terminator != "{":
+                return None
+            name = self.__getClassName(tokens[1:])
+            if not name:
+                return None
+            return ("class", TokenResults(templateParamList=template, className=name,
+                    classOrStruct=first))
+        if first == "enum":
+            if terminator != "{":
+                return None
+            return ("enum", TokenResults(enumName=self.__getEnumName(tokens[1:])))
+        return self.__recognizeFunction(tokens, template, terminator, status, className)
+
+    def recognizeEnumMembers(self, tokens):
+        """
+        Return the names of the members of an enum, tokens is the content between the braces.
+        The members are split by the commas outside of (), [] and {} only, '<' and '>'
+        in an enum are always operators.
+        """
+        members = []
+        for chunk in splitList(tokens, False):
+            if chunk and chunk[0][0] == IDENT:
+                members.append(chunk[0][1])
+        return members
+
+    def __recognizeFunction(self, tokens, template, terminator, status, className):
+        nameStart, paren = self.__findName(tokens)
+        if paren < 0:
+            return None
+        close = self.__findClose(tokens, paren)
+        if close < 0:
+            return None
+
+        prefix = tokens[:nameStart]
+        specifiers = [t[1] for t in prefix if t[1] in self.__specifiers]
+        returnType = [t for t in prefix if t[1] not in self.__specifiers]
+        name = "".join(self.__joinOperator([t[1] for t in tokens[nameStart:paren]]))
+        params = tokens[paren + 1:close]
+        trailer = [t[1] for t in tokens[close + 1:]]
+        semicolon = ";" if terminator == ";" else ""
+
+        if "=" in trailer:
+            pos = trailer.index("=")
+            if trailer[pos + 1:pos + 2] != ["0"]:
+                # defaulted or deleted functions have nothing to implement
+                return None
+        if nameStart > 0 and tokens[nameStart - 1][1] == "::":
+            return ("body", TokenResults(funcName=name)) if not semicolon else None
+
+        if name.startswith("~"):
+            if status != "class" or returnType:
+                return None
+            return ("dtor", TokenResults(funcName=name, semicolon=semicolon))
+
+        if not returnType and not name.startswith("operator"):
+            if status != "class" or name != className:
+                return None
+            paramList = self.__getParamList(params)
+            if paramList is None:
+                return None
+            return ("ctor", TokenResults(funcName=name, paramList=paramList, semicolon=semicolon))
+
+        if tokens[nameStart][1] in self.__keywords and not name.startswith("operator"):
+            return None
+        for kind, text in returnType:
+            if kind == PUNCT and text not in self.__typePuncts:
+                return None
+        paramList = self.__getParamList(params)
+        if paramList is None:
+            return None
+        end = trailer.index("=") if "=" in trailer else len(trailer)
+        const = "const" if "const" in trailer[:end] else ""
+        return ("function", TokenResults(templateParamList=template,
+                static="static" if "static" in specifiers else "",
+                virtual="virtual" if "virtual" in specifiers else "",
+                returnType=self.__buildType(returnType), funcName=name, paramList=paramList,
+                const=const, semicolon=semicolon))
+
+    def __findName(self, tokens):
+        """
+        Return the positions of the function name and the opening parenthesis of its
+        parameter list, or (-1, -1) if the statement is not function-like.
+        """
+        angle = 0
+        prev = None
+        for pos, (kind, text) in enumerate(tokens):
+            if text == "operator":
+                paren = pos + 1
+                if tokens[paren:paren + 2] == [(PUNCT, "("), (PUNCT, ")")]:
+                    paren += 2
+                while paren < len(tokens) and tokens[paren][1] != "(":
+                    paren += 1
+                return (pos, paren) if paren < len(tokens) else (-1, -1)
+            elif text == "<" and prev == IDENT:
+                angle += 1
+            elif text == ">" and angle:
+                angle -= 1
+            elif text == "(" and not angle:
+                if pos and tokens[pos - 1][0] == IDENT:
+                    if pos > 1 and tokens[pos - 2][1] == "~":
+                        return (pos - 2, pos)
+                    return (pos - 1, pos)
+                return (-1, -1)
+            prev = kind
+        return (-1, -1)
+
+    def __findClose(self, tokens, pos):
+        depth = 0
+        for i in xrange(pos, len(tokens)):
+            text = tokens[i][1]
+            if text == "(":
+                depth += 1
+            elif text == ")":
+                depth -= 1
+                if not depth:
+                    return i
+        return -1
+
+    def __joinOperator(self, names):
+        out = []
+        for name in names:
+            if out and (out[-1][-1].isalnum() or out[-1][-1] == "_") and (name[0].isalnum() or name[0] == "_"):
+                out.append(" ")
+            out.append(name)
+        return out
+
+    def __splitTemplate(self, tokens):
+        if not tokens or tokens[0][1] != "template" or len(tokens) < 2 or tokens[1][1] != "<":
+            return "", tokens
+        depth = 0
+        for pos in xrange(1, len(tokens)):
+            text = tokens[pos][1]
+            if text == "<":
+                depth += 1
+            elif text == ">":
+                depth -= 1
+                if not depth:
+                    names = []
+                    for chunk in splitList(tokens[2:pos]):
+                        texts = [t[1] for t in chunk]
+                        if "=" in texts:
+                            chunk = chunk[:texts.index("=")]
+                        if chunk and chunk[-1][0] == IDENT:
+                            names.append(chunk[-1][1])
+                    return names, tokens[pos + 1:]
+        return "", []
+
+    def __getClassName(self, tokens):
+        name = ""
+        for kind, text in tokens:
+            if text == ":":
+                break
+            if kind == IDENT and text != "final":
+                name = text
+        return name
+
+    def __getEnumName(self, tokens):
+        for kind, text in tokens:
+            if text == ":":
+                break
+            if kind == IDENT and text != "class" and text != "struct":
+                return text
+        return ""
+
+    def __getParamList(self, tokens):
+        chunks = splitList(tokens)
+        if len(chunks) == 1 and [t[1] for t in chunks[0]] in ([], ["void"]):
+            return []
+        paramList = []
+        for chunk in chunks:
+            texts = [t[1] for t in chunk]
+            if "=" in texts:
+                chunk = chunk[:texts.index("=")]
+            if not chunk or (chunk[0][0] != IDENT and chunk[0][1] not in ("::", "...")):
+                return None
+            name = ""
+            if len(chunk) > 1:
+                if chunk[-1][1] == "]" and "[" in texts:
+                    pos = texts.index("[")
+                    if chunk[pos - 1][0] == IDENT:
+                        name = "".join(texts[pos - 1:len(chunk)])
+                        chunk = chunk[:pos - 1]
+                elif chunk[-1][0] == IDENT and chunk[-1][1] not in self.__keywords \
+                        and chunk[-2][1] != "::" \
+                        and [t for t in chunk[:-1] if t[1] not in self.__qualifiers]:
+                    name = chunk[-1][1]
+                    chunk = chunk[:-1]
+            paramList.append([self.__buildType(chunk), name])
+        return paramList
+
+    def __buildType(self, tokens):
+        """
+        Build the nested list of a type in the layout of the pyparsing grammar, so that
+        CppHeaderParser.assemblyType can assemble it. Template arguments are sub-lists.
+        """
+        out = []
+        pos = 0
+        while pos < len(tokens):
+            kind, text = tokens[pos]
+            last = out[-1] if out and not isinstance(out[-1], list) else ""
+            if text == "<":
+                close = self.__findAngleClose(tokens, pos)
+                out.append("<")
+                for chunk in splitList(tokens[pos + 1:close]):
+                    out.append(self.__buildType(chunk))
+                out.append(">")
+                pos = close
+            elif (text == "::" and last and (last[-1].isalnum() or last[-1] == "_")) \
+                    or (kind == IDENT and last.endswith("::")):
+                out[-1] = last + text
+            else:
+                out.append(text)
+            pos += 1
+        return out
+
+    def __findAngleClose(self, tokens, pos):
+        depth = 0
+        for i in xrange(pos, len(tokens)):
+            text = tokens[i][1]
+            if text == "<":
+                depth += 1
+            elif text == ">":
+                depth -= 1
+                if not depth:
+                    return i
+        return len(tokens)
+
@@ -19,21 +19,26 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 from __future__ import with_statement
-from sys import stdin
 from sys import stdout
-from sys import stderr
 from os import path
 from getopt import GetoptError
 from os import makedirs
 from fgconfig import XmlConfig
 from filedepot import FileDepot
-from cppheaderparser import CppHeaderParser
+from cppheadermodel import CppHeaderModel
 from templateparser import TemplateParser
 from cppheaderparser import CppHeaderObserver
 from fgutils import dieOnExists
 from templateparser import TemplateParserObserver
 from filegenerator import FileGenerator
+from cppmerge import mergeTests
+from StringIO import StringIO
 import re
+import sys
+
+TEST_REGISTRATION = "    CPPUNIT_TEST(%s);\n"
+TEST_DECLARATION = "    void %s();\n"
+TEST_STUB = "void %s::%s()\n{\n    CPPUNIT_FAIL(\"not implemented\");\n}\n"
 
 class CppUnitGenImpl(CppHeaderObserver):
     def __init__(self, header, output):
@@ -71,28 +76,13 @@ class CppUnitGenImpl(CppHeaderObserver):
     def onClassEnd(self, scopes, clsName):
         if not self.__classNames or self.__classNames[-1] != clsName:
             raise RuntimeError("mismatched class names")
-        testClassName = "%sTest" % clsName
-        self.__output.write("class %s : public CppUnit::TestFixture\n" % testClassName)
-        self.__output.write("{\n")
-        self.__output.write("    CPPUNIT_TEST_SUITE(%s);\n" % testClassName)
-        map(lambda func:self.__output.write("    CPPUNIT_TEST(%s);\n" % func), self.__classFunctions[-1])
-        self.__output.write("    CPPUNIT_TEST_SUITE_END();\n\n")
-        self.__output.write("public:\n")
-        self.__output.write("    void setUp();\n")
-        self.__output.write("    void tearDown();\n\n")
-        map(lambda func:self.__output.write("    void %s();\n" % func), self.__classFunctions[-1])
-        self.__output.write("};\n\n")
-        self.__output.write("CPPUNIT_TEST_SUITE_REGISTRATION(%s);\n\n" % testClassName)
-
-        # add functions implementation here
-        self.__output.write("void %s::setUp()\n{\n}\n\n" % testClassName)
-        self.__output.write("void %s::tearDown()\n{\n}\n\n" % testClassName)
-        map(lambda func:self.__output.write("void %s::%s()\n{\n    CPPUNIT_FAIL(\"not implemented\");\n}\n\n" % \
-               (testClassName, func)), self.__classFunctions[-1])
-
+        self.writeTestClass("%sTest" % clsName, self.__classFunctions[-1])
         self.__classNames.pop()
         self.__classFunctions.pop()
 
+    def writeTestClass(self, testClassName, functions):
+        self.__output.write(formatTestClass(testClassName, functions))
+
     def onCtorDecl(self, scopes, ctorName, paramList):
         self.__onFunctionImpl(scopes, "Constructor")
 
@@ -131,6 +121,52 @@ class CppUnitGenImpl(CppHeaderObserver):
         except ValueError:
             functions.append(testFuncName)
 
+class CppUnitMergeImpl(CppUnitGenImpl):
+    """
+    Collects the test classes of the header instead of writing them, for mergeTests.
+    """
+    def __init__(self, header):
+        CppUnitGenImpl.__init__(self, header, None)
+        self.__testClasses = []
+
+    def onPreParse(self, scopes):
+        pass
+
+    def onNamespace(self, scopes, namespace):
+        pass
+
+    def writeTestClass(self, testClassName, functions):
+        tests = [(func, TEST_REGISTRATION % func, TEST_DECLARATION % func,
+                TEST_STUB % (testClassName, func)) for func in functions]
+        self.__testClasses.append((testClassName, tests,
+                formatTestClass(testClassName, functions)))
+
+    def getTestClasses(self):
+        return self.__testClasses
+
+def formatTestClass(testClassName, functions):
+    """
+    Return the whole text of the test class with the test functions.
+    """
+    output = StringIO()
+    output.write("class %s : public CppUnit::TestFixture\n" % testClassName)
+    output.write("{\n")
+    output.write("    CPPUNIT_TEST_SUITE(%s);\n" % testClassName)
+    map(lambda func:output.write(TEST_REGISTRATION % func), functions)
+    output.write("    CPPUNIT_TEST_SUITE_END();\n\n")
+    output.write("public:\n")
+    output.write("    void setUp();\n")
+    output.write("    void tearDown();\n\n")
+    map(lambda func:output.write(TEST_DECLARATION % func), functions)
+    output.write("};\n\n")
+    output.write("CPPUNIT_TEST_SUITE_REGISTRATION(%s);\n\n" % testClassName)
+
+    # add functions implementation here
+    output.write("void %s::setUp()\n{\n}\n\n" % testClassName)
+    output.write("void %s::tearDown()\n{\n}\n\n" % testClassName)
+    map(lambda func:output.write(TEST_STUB % (testClassName, func) + "\n"), functions)
+    return output.getvalue()
+
 class UnitTestMakefileObserver(TemplateParserObserver):
     def __init__(self):
         self.__srcRe = re.compile(r"\ASRC\s*=.*")
@@ -138,9 +174,11 @@ class UnitTestMakefileObserver(TemplateParserObserver):
     def onPostProcessLine(self, line, output):
         match = self.__srcRe.search(line)
         if match:
-            stderr.write("Which file contains main function in current dir: ")
-            stderr.flush()
-            filename = stdin.readline().strip()
+            # sys.stdin and sys.stderr are looked up on each call, fgendaemon replaces them
+            # with the ones of its client
+            sys.stderr.write("Which file contains main function in current dir: ")
+            sys.stderr.flush()
+            filename = sys.stdin.readline().strip()
             suffix = XmlConfig().getCppSuffix()
             if filename:
                 output.write("SRC     += $(filter-out ../%s, $(wildcard ../*%s))\n" % (filename, suffix))
@@ -154,6 +192,11 @@ class CppUnitGen(FileGenerator):
     def getOptionTuple(self):
         return ("-u", "--unittest")
 
+    def prepare(self):
+        self.__checkAndMakeUnitTestDir()
+        self.__checkAndGenerateUnitTestMakefile()
+        self.__checkAndGenerateUnitTestMain()
+
     def run(self):
         hopt, header = self.__getOptArg__(("-h", "--header"))
         if not header:
@@ -174,16 +217,18 @@ class CppUnitGen(FileGenerator):
         self.__checkAndMakeUnitTestDir()
         self.__checkAndGenerateUnitTestMakefile()
         self.__checkAndGenerateUnitTestMain()
+        if path.exists(cppUnitFile) and self.__getOptArg__(("--merge",))[0]:
+            merger = CppUnitMergeImpl(header)
+            CppHeaderModel.getModel(header).render(merger)
+            count = mergeTests(cppUnitFile, merger.getTestClasses())
+            print "\t%s\t\t\t\t[MERGED %d]" % (cppUnitFile, count)
+            return
         dieOnExists(cppUnitFile)
         FileDepot().add(cppUnitFile)
         parser = TemplateParser("template.cpp", cppUnitFile)
         parser.parse()
         with open(cppUnitFile, "a+") as output:
-            headerParser = CppHeaderParser(header)
-            cppUnitGenImpl = CppUnitGenImpl(header, output)
-            cppUnitGenImpl.setParser(headerParser)
-            headerParser.addObserver(cppUnitGenImpl)
-            headerParser.parse()
+            CppHeaderModel.getModel(header).render(CppUnitGenImpl(header, output))
         print "\t" + cppUnitFile + "\t\t\t\t[OK]"
         
     def __checkAndMakeUnitTestDir(self):
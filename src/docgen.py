@@ -22,7 +22,8 @@ from __future__ import with_statement
 from os import path
 from os import rename
 from getopt import GetoptError
-from cppheaderparser import CppHeaderParser, CppHeaderObserver
+from cppheaderparser import CppHeaderObserver
+from cppheadermodel import CppHeaderModel
 from filegenerator import FileGenerator
 import re 
 
@@ -46,10 +47,7 @@ class DocGen(FileGenerator, CppHeaderObserver):
             raise GetoptError("too many arguments")
 
         self.__target = header
-        headerParser = CppHeaderParser(header)
-        self.setParser(headerParser)
-        headerParser.addObserver(self)
-        headerParser.parse()
+        CppHeaderModel.getModel(header).render(self)
         self.__printToDocs()
         print "\t" + self.__target + "\t\t\t\t[OK]"
 
@@ -101,6 +99,9 @@ class DocGen(FileGenerator, CppHeaderObserver):
                             if toComment and self.__toDocs[0][0] == lineno:
                                 toPrint = self.__toDocs.pop(0)
                                 self.__printDoc(output, line, toPrint)
+                                # only the first declaration on a line gets documented
+                                while self.__toDocs and self.__toDocs[0][0] == lineno:
+                                    self.__toDocs.pop(0)
                     finally:
                         output.write(line)
         if not self.__verify(self.__target, filename):
@@ -18,10 +18,19 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
-from xml.dom import minidom
+from __future__ import with_statement
+from os import fdopen
 from os import path
 from os import getenv
+from os import remove
+from os import rename
+from os import stat
 from sys import stdout
+import marshal
+import sys
+
+# the version of the layout of the config cache, bump it when the snapshot changes
+CONFIG_CACHE_VERSION = 2
 
 class Option:
     def __init__(self, shortOpt, longOpt, hasArg, package, slotClass, priority, comment):
@@ -32,6 +41,7 @@ class Option:
         self.__slotClass = slotClass
         self.__priority = priority
         self.__comment = comment
+        self.__slot = None
         
     def getShortOpt(self):
         return self.__shortOpt
@@ -53,89 +63,119 @@ class Option:
     
     def getComment(self):
         return self.__comment
+
+    def getSlot(self):
+        """
+        Return the generator class of the option, its package is imported on the first
+        call, so a run imports only the generators it uses.
+        """
+        if self.__slot is None:
+            __import__(self.__package)
+            self.__slot = getattr(sys.modules[self.__package], self.__slotClass)
+        return self.__slot
     
     def comparePriority(opt1, opt2):
-        pri1 = eval(opt1.getPriority())
-        pri2 = eval(opt2.getPriority())
+        pri1 = int(opt1.getPriority())
+        pri2 = int(opt2.getPriority())
         return 1 if pri1 > pri2 else 0 if pri1 == pri2 else -1
 
 class XmlConfig:
+    """
+    The config in ~/.fgen/fgen.xml. The xml is parsed once per process, see refresh,
+    into an immutable snapshot shared by all the instances, with the scalar settings in a
+    dict, the options sorted by their parse order, the getopt specs of the options
+    precomputed, and the registry of the generators that maps the short and long
+    options to the options. The generator classes are imported lazily, see
+    Option.getSlot.
+
+    The snapshot is also marshalled into fgen.xml.cache beside the xml, stamped with
+    the mtime and the size of the xml, so that the later processes load it instead of
+    parsing the xml. A cache that is stale or can't be loaded is rebuilt.
+    """
     __configPath = None
-    __rootElement = None
-    __options = None
+    __snapshot = None
+    __stamp = None
 
     def __init__(self):
-        if not self.__rootElement:
-            xmlFile = path.join(self.getConfigPath(), "fgen.xml")
-            doc = minidom.parse(xmlFile)
-            self.__rootElement = doc.documentElement
+        if not XmlConfig.__snapshot:
+            self.__load()
+
+    def refresh(self):
+        """
+        Load the snapshot again if the xml has changed since it's loaded, for a process
+        that outlives the edits of the xml, like fgendaemon. The snapshot is kept if the
+        xml can't be loaded.
+        """
+        if self.__getStamp() != XmlConfig.__stamp:
+            self.__load()
+
+    def __load(self):
+        xmlFile = path.join(self.getConfigPath(), "fgen.xml")
+        cacheFile = xmlFile + ".cache"
+        stamp = self.__getStamp()
+        snapshot = self.__loadCache(cacheFile, stamp)
+        if snapshot is None:
+            # minidom and tempfile are imported only when the cache misses, they are
+            # slow to import
+            from xml.dom import minidom
+            snapshot = self.__buildSnapshot(minidom.parse(xmlFile))
+            self.__storeCache(cacheFile, stamp, snapshot)
+        snapshot["options"] = tuple([Option(*fields) for fields in snapshot["options"]])
+        XmlConfig.__snapshot = snapshot
+        XmlConfig.__stamp = stamp
+
+    def __getStamp(self):
+        st = stat(path.join(self.getConfigPath(), "fgen.xml"))
+        return (CONFIG_CACHE_VERSION, st.st_mtime, st.st_size)
 
     def getConfigPath(self):
-        if not self.__configPath:
+        if not XmlConfig.__configPath:
             home = getenv("HOME")
             if home == None:
                 exit("Error: you need to set HOME environment variable")
-            self.__configPath = path.join(home, ".fgen")
-        return self.__configPath
+            XmlConfig.__configPath = path.join(home, ".fgen")
+        return XmlConfig.__configPath
 
     def getAuthor(self):
-        return self.__getSingleValue(self.__rootElement, "author")
+        return self.get("author")
 
     def getWrapperPrefix(self):
-        return self.__getSingleValue(self.__rootElement, "wrapper_prefix")
+        return self.get("wrapper_prefix")
 
     def getCppSuffix(self):
-        suffix = self.__getSingleValue(self.__rootElement, "default_cpp_suffix")
+        suffix = self.get("default_cpp_suffix")
         return ".cc" if suffix == None or suffix == "" else suffix
 
     def getUnitTestDir(self):
-        return self.__getSingleValue(self.__rootElement, "unit_test_dir")
+        return self.get("unit_test_dir")
     
     def get(self, key):
-        return self.__getSingleValue(self.__rootElement, key)
+        values = self.__snapshot["values"]
+        if key not in values:
+            raise ValueError("Error: there are less or more than 1 node for %s" % key)
+        return values[key]
 
     def getOptions(self):
-        if not self.__options:
-            self.__options = []
-            nodes = self.__rootElement.getElementsByTagName("options")        
-            if len(nodes) != 1:
-                raise ValueError("Error: there are less or more than 1 node for options")
-            
-            nodes = nodes[0].getElementsByTagName("option")
-            for node in nodes:
-                shortOpt = self.__getSingleValue(node, "short_option")
-                longOpt = self.__getSingleValue(node, "long_option")
-                hasArg = self.__getSingleValue(node, "has_argument")
-                package = self.__getSingleValue(node, "package")
-                slotClass = self.__getSingleValue(node, "slot_class")
-                priority = self.__getSingleValue(node, "parse_order")
-                comment = self.__getSingleValue(node, "comment")
-                self.__options.append(Option(shortOpt, longOpt, hasArg, package,
-                        slotClass, priority, comment))
-            self.__options.sort(Option.comparePriority)
-        return self.__options
+        return self.__snapshot["options"]
+
+    def findOptions(self, names):
+        """
+        Return the options of the names, like "-c" or "--cpp", in the parse order.
+
+        Parameters:
+            names(list): the names of the options in the command line, the names that
+            are not generator options are ignored.
+        """
+        generators = self.__snapshot["generators"]
+        indexes = set([generators[name] for name in names if name in generators])
+        options = self.__snapshot["options"]
+        return [options[i] for i in sorted(indexes)]
     
     def getShortOptions(self):
-        shortOptions = ""
-        options = self.getOptions()
-        for option in options:
-            shortOpt = option.getShortOpt()
-            hasArg = option.getHasArg()
-            shortOptions = shortOptions + shortOpt
-            if hasArg.lower() == "true":
-                shortOptions = shortOptions + ':'
-        return shortOptions
+        return self.__snapshot["shortOptions"]
     
     def getLongOptions(self):
-        longOptions = []
-        options = self.getOptions()
-        for option in options:
-            longOpt = option.getLongOpt()
-            hasArg = option.getHasArg()
-            if hasArg.lower() == "true":
-                longOpt = longOpt.strip() + '='
-            longOptions.append(longOpt)
-        return longOptions
+        return list(self.__snapshot["longOptions"])
     
     def printOptionUsage(self, output = stdout):
         print>>output, "Options:"
@@ -151,23 +191,99 @@ class XmlConfig:
                 print>>output, "  -%s, --%s" % (shortOpt, longOpt)
             print>>output, "      %s" % comment
 
-    def __getValueList(self, element, name):
-        values = []
-        nodes = element.getElementsByTagName(name)
-        for node in nodes:
-            if node.nodeType == node.ELEMENT_NODE:
-                for nd in node.childNodes:
-                    if nd.nodeType == node.TEXT_NODE or nd.nodeType == node.CDATA_SECTION_NODE:
-                        values.append(nd.data)
-        return values
+    def __buildSnapshot(self, doc):
+        root = doc.documentElement
+        counts = {}
+        for node in root.getElementsByTagName("*"):
+            counts[node.tagName] = counts.get(node.tagName, 0) + 1
+        # the settings are the elements that appear once in the xml
+        values = {}
+        for node in root.getElementsByTagName("*"):
+            if counts[node.tagName] == 1:
+                values[node.tagName] = self.__getText(node)
+
+        nodes = root.getElementsByTagName("options")
+        if len(nodes) != 1:
+            raise ValueError("Error: there are less or more than 1 node for options")
+        options = []
+        for node in nodes[0].getElementsByTagName("option"):
+            shortOpt = self.__getSingleValue(node, "short_option")
+            longOpt = self.__getSingleValue(node, "long_option")
+            hasArg = self.__getSingleValue(node, "has_argument")
+            package = self.__getSingleValue(node, "package")
+            slotClass = self.__getSingleValue(node, "slot_class")
+            priority = self.__getSingleValue(node, "parse_order")
+            comment = self.__getSingleValue(node, "comment")
+            options.append(Option(shortOpt, longOpt, hasArg, package,
+                    slotClass, priority, comment))
+        options.sort(Option.comparePriority)
+
+        shortOptions = ""
+        longOptions = []
+        generators = {}
+        for i, option in enumerate(options):
+            generators["-" + option.getShortOpt()] = i
+            generators["--" + option.getLongOpt()] = i
+            hasArg = option.getHasArg().lower() == "true"
+            shortOptions = shortOptions + option.getShortOpt() + (":" if hasArg else "")
+            longOpt = option.getLongOpt()
+            longOptions.append(longOpt.strip() + "=" if hasArg else longOpt)
+        # the options are kept as the tuples of their fields, which can be marshalled
+        options = tuple([(o.getShortOpt(), o.getLongOpt(), o.getHasArg(), o.getPackage(),
+                o.getSlotClass(), o.getPriority(), o.getComment()) for o in options])
+        return {"values": values, "options": options, "generators": generators,
+                "shortOptions": shortOptions, "longOptions": tuple(longOptions)}
+
+    def __loadCache(self, cacheFile, stamp):
+        """
+        Return the snapshot in the cache file, or None if it's stale or can't be loaded.
+        """
+        try:
+            with open(cacheFile, "rb") as f:
+                cachedStamp, snapshot = marshal.load(f)
+            if cachedStamp != stamp:
+                return None
+            for key in ("values", "options", "generators", "shortOptions", "longOptions"):
+                if key not in snapshot:
+                    return None
+            return snapshot
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def __storeCache(self, cacheFile, stamp, snapshot):
+        """
+        Write the snapshot into the cache file, a cache that can't be written is silently
+        skipped.
+        """
+        from tempfile import mkstemp
+        try:
+            fd, tmpPath = mkstemp(".tmp", "fgen.xml.", path.dirname(cacheFile))
+        except (IOError, OSError):
+            return
+        try:
+            try:
+                with fdopen(fd, "wb") as f:
+                    marshal.dump((stamp, snapshot), f)
+                rename(tmpPath, cacheFile)
+            except (IOError, OSError, ValueError):
+                pass
+        finally:
+            # the temporary file is still there if it's not renamed to the cache
+            try:
+                if path.exists(tmpPath):
+                    remove(tmpPath)
+            except OSError:
+                pass
 
     def __getSingleValue(self, element, name):
         nodes = element.getElementsByTagName(name)
         if len(nodes) != 1:
-            raise ValueError("Error: there are less or more than 1 node for %" % name)
+            raise ValueError("Error: there are less or more than 1 node for %s" % name)
+        return self.__getText(nodes[0])
 
-        if nodes[0].nodeType == nodes[0].ELEMENT_NODE:
-            for node in nodes[0].childNodes:
+    def __getText(self, element):
+        if element.nodeType == element.ELEMENT_NODE:
+            for node in element.childNodes:
                 if node.nodeType == node.TEXT_NODE or node.nodeType == node.CDATA_SECTION_NODE:
                     return node.data
         return ""
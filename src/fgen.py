@@ -21,10 +21,17 @@
 from __future__ import with_statement
 from getopt import getopt
 from getopt import GetoptError
+from collections import deque
+from glob import glob
+from time import time
 import sys
+from os import environ
+from os import path
+from os import walk
 from StringIO import StringIO
 from filedepot import FileDepot
 from fgconfig import XmlConfig
+from fgutils import isHeader
 
 __doc__ = \
 """
@@ -32,6 +39,13 @@ fgen - A command line tool to generate the skeleton of kinds of files in c++ dev
 
 Usage: fgen [options] arguments
 
+Several generators can run at once from one parse of the header, e.g.
+fgen -h foo.h -c -u -d generates the cpp file, the unit test and the document.
+
+Several headers can be generated for in one run, by several -h options, by -h with
+a wildcard, or by -r with a directory, e.g. fgen -c -r include/. A header that fails
+doesn't stop the others, a summary of all the headers is printed at the end.
+
 Options:
   -c, --cpp
       generate cpp file
@@ -44,8 +58,25 @@ Options:
       generate the doxygen document for the header file
   -h HEADER, --header=HEADER
       specify header file to generate or to generate cpp file base on this header file
+  -r DIR, --recursive=DIR
+      generate for all the headers under the directory
+  --jobs=N
+      generate for the headers in N processes, the output stays in the order of the headers,
+      and the throughput of the stages of the run is printed at the end
+  --watch=DIR
+      generate for the headers under the directory whenever they are saved, the cpp
+      file and the unit test are generated if no generator is specified, and merged
+      if they exist
+  --merge
+      merge the stubs of the new declarations into the cpp file and the unit test if they exist
+  --cache
+      replay the events of the unchanged headers from the parse cache under ~/.fgen/cache
+  --no-cache
+      parse the headers without the parse cache, even if FGEN_CACHE is "on"
 """
 
+PIPELINE_DEPTH = 4
+
 __reportTo__ = "\nAny bug or suggestion, please report to <wanjunfeng@gmail.com>, thanks!"
 
 def getUsage():
@@ -57,53 +88,317 @@ def getUsage():
     print>>output
     print>>output, "Usage: fgen [options] arguments\n"
     XmlConfig().printOptionUsage(output)
+    print>>output, "  -r DIR, --recursive=DIR"
+    print>>output, "      generate for all the headers under the directory"
+    print>>output, "  --jobs=N"
+    print>>output, "      generate for the headers in N processes, the output stays in the order of the headers"
+    print>>output, "  --watch=DIR"
+    print>>output, "      generate for the headers under the directory whenever they are saved"
+    print>>output, "  --merge"
+    print>>output, "      merge the stubs of the new declarations into the cpp file and the unit test if they exist"
+    print>>output, "  --cache"
+    print>>output, "      replay the events of the unchanged headers from the parse cache under ~/.fgen/cache"
+    print>>output, "  --no-cache"
+    print>>output, "      parse the headers without the parse cache, even if FGEN_CACHE is \"on\""
     output.write(__reportTo__)
     content = output.getvalue()
     output.close()
     return content
 
-def createGenerator(pkg, className, *args):
+def createGenerators(opts, args):
+    """
+    Create the generators of the options, in the parse order of the config. A generator
+    is added into fgen by the config only, its package is imported when it's used.
+    """
+    optlist = []
+    for opt in opts:
+        optlist = optlist + [x for x in opt if x]
+
+    instances = []
+    priority = None
+    for option in XmlConfig().findOptions(optlist):
+        if priority != None and option.getPriority() != priority:
+            # the options of a later parse order, like -h, are the arguments
+            # of the generators found so far
+            break
+        priority = option.getPriority()
+        instances.append(option.getSlot()(opts, args))
+
+    if len(instances) > 1 and args:
+        raise GetoptError("can't name the file to generate for more than one generator")
+    return instances
+
+def runGenerators(opts, args):
+    # the generators run in the parse order of the config, and they share the
+    # parse of the header, see CppHeaderModel
+    for instance in createGenerators(opts, args):
+        instance.init()
+        instance.run()
+
+def findHeaders(patterns, directories):
+    """
+    Return the headers matching the patterns of the -h options, and the headers under
+    the directories of the -r options. A pattern that matches nothing is kept, so that
+    it fails as a missing header.
+    """
+    headers = []
+    for pattern in patterns:
+        headers.extend(sorted(glob(pattern)) or [pattern])
+    for directory in directories:
+        for root, dirs, files in walk(directory):
+            dirs.sort()
+            headers.extend([path.join(root, name) for name in sorted(files)
+                    if isHeader(name)])
+    return headers
+
+def generateHeader(opts, header):
+    """
+    Run the generators for the header as one transaction, the files of the header are
+    rolled back if it fails. Return the error, or None if it succeeds.
+    """
+    # imported here, so the runs without a header don't import the parser
+    from cppheadermodel import CppHeaderModel
+
+    try:
+        try:
+            runGenerators(opts + [("-h", header)], [])
+            FileDepot().clean()
+            return None
+        except SystemExit, ex:
+            FileDepot().removeAllFromDisk()
+            return str(ex.code)
+        except Exception, ex:
+            FileDepot().removeAllFromDisk()
+            return str(ex)
+    finally:
+        # the model isn't used after the header is done
+        CppHeaderModel.clear()
+
+def generateCaptured(task):
+    """
+    Run generateHeader in a worker process. Return the output and the error of it, and
+    the seconds spent in the parse and in the render of the header.
+    """
+    from cppheadermodel import CppHeaderModel
+
+    opts, header = task
+    stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        start = time()
+        try:
+            if path.isfile(header):
+                # parsed ahead of the generators, which share the model, to time the
+                # stages apart
+                CppHeaderModel.getModel(header)
+        except Exception:
+            # the generators fail on it again and report it
+            pass
+        parsed = time()
+        error = generateHeader(opts, header)
+        return sys.stdout.getvalue(), error, parsed - start, time() - parsed
+    finally:
+        sys.stdout = stdout
+
+def getSize(header):
+    try:
+        return path.getsize(header)
+    except OSError:
+        return 0
+
+class PipelineStats:
+    """
+    The throughput counters of the stages of a pipelined batch run. The seconds of a
+    stage are its busy time summed over the processes that run it.
+    """
+    def __init__(self, jobs):
+        self.__jobs = jobs
+        self.__headers = 0
+        self.__bytes = 0
+        self.__seconds = {"parse": 0.0, "render": 0.0, "wait": 0.0}
+
+    def add(self, stage, seconds):
+        self.__seconds[stage] += seconds
+
+    def addHeader(self, size):
+        self.__headers += 1
+        self.__bytes += size
+
+    def printTo(self, output):
+        megabytes = self.__bytes / 1048576.0
+        print>>output, "%-8s %8s %10s %10s %10s" % ("stage", "headers", "MB", "seconds", "MB/s")
+        for stage, processes in (("parse", self.__jobs), ("render", self.__jobs)):
+            seconds = self.__seconds[stage]
+            rate = megabytes * processes / seconds if seconds else 0
+            print>>output, "%-8s %8d %10.2f %10.3f %10.2f" % (stage, self.__headers,
+                    megabytes, seconds, rate)
+        # a long wait means the workers are the bottleneck, a short one the parent
+        print>>output, "the output waited %.3f seconds for the workers" % self.__seconds["wait"]
+
+def runPool(opts, headers, jobs):
+    """
+    Run generateHeader for the headers in a pipeline, return the errors of the headers.
+    A pool of processes parses the headers and renders and writes the generated files,
+    and the parent prints the output in the order of the headers. The largest headers
+    start first, so that a huge header doesn't run alone at the end. At most
+    PIPELINE_DEPTH headers per process are on the way, so the outputs waiting for an
+    earlier header to be printed stay bounded. Return None if there's no
+    multiprocessing, i.e. on python 2.5.
+    """
+    try:
+        from multiprocessing import Pool
+    except ImportError:
+        return None
+
+    # the files shared by the headers, like the makefile of the unit tests, are
+    # generated before the workers race for them
+    for instance in createGenerators(opts, []):
+        instance.init()
+        instance.prepare()
+    FileDepot().clean()
+
+    stats = PipelineStats(jobs)
+    sizes = [getSize(header) for header in headers]
+    pending = deque(sorted(range(len(headers)), key=lambda i: sizes[i], reverse=True))
+    started = set()
+    results = {}
+    depth = PIPELINE_DEPTH * jobs
+    pool = Pool(jobs)
+
+    def submit(i):
+        started.add(i)
+        stats.addHeader(sizes[i])
+        results[i] = pool.apply_async(generateCaptured, ((opts, headers[i]),))
+
+    try:
+        errors = []
+        for i in xrange(len(headers)):
+            if i not in started:
+                # the header to print next goes before the larger ones, it's skipped
+                # when its turn in pending comes
+                submit(i)
+            while pending and len(results) < depth:
+                j = pending.popleft()
+                if j not in started:
+                    submit(j)
+            start = time()
+            output, error, parsing, rendering = results.pop(i).get()
+            stats.add("wait", time() - start)
+            stats.add("parse", parsing)
+            stats.add("render", rendering)
+            sys.stdout.write(output)
+            errors.append(error)
+        pool.close()
+        pool.join()
+    except:
+        pool.terminate()
+        raise
+
+    print
+    stats.printTo(sys.stdout)
+    return errors
+
+def runBatch(opts, args, headers, jobs):
+    """
+    Run the generators for each of the headers. A header that fails doesn't stop the
+    rest of the headers, see generateHeader.
+    """
+    if args:
+        raise GetoptError("can't name the file to generate for more than one header")
+    errors = None
+    if jobs > 1 and len(headers) > 1:
+        errors = runPool(opts, headers, jobs)
+    if errors is None:
+        # the headers are generated one by one
+        errors = [generateHeader(opts, header) for header in headers]
+
+    failures = [(header, error) for header, error in zip(headers, errors) if error != None]
+    print
+    print "%d headers, %d succeeded, %d failed" % (len(headers),
+            len(headers) - len(failures), len(failures))
+    for header, error in failures:
+        print "\t%s\t\t\t\t[FAILED] %s" % (header, error)
+    if failures:
+        sys.exit(1)
+
+def runWatch(opts, args, directories):
     """
-    With this function, we can add a module into fgen without changing any code but config file.
+    Generate for the headers under the directories whenever they change, the cpp file
+    and the unit test are generated if no generator is specified. The generated files
+    that exist are merged with the changes.
     """
-    exec "import %s" % pkg
-    exec "instance = %s.%s(*args)" % (pkg, className)
-    return instance
+    from fgenwatch import watch
+
+    if args or [o for o, a in opts if o in ("-h", "--header", "-r", "--recursive")]:
+        raise GetoptError("the headers to watch are the ones under the --watch directories")
+    if not [o for o, a in opts if o != "--merge"]:
+        opts = [("-c", ""), ("-u", "")]
+    opts = [(o, a) for o, a in opts if o != "--merge"] + [("--merge", "")]
+    try:
+        watch(directories, lambda header: generateHeader(opts, header))
+    except KeyboardInterrupt:
+        pass
 
-def main():
-    if len(sys.argv) == 1:
+def main(argv):
+    if not argv:
         sys.exit(getUsage())
 
+    argv = list(argv)
+    for option, value in (("--cache", "on"), ("--no-cache", "off")):
+        # not generator options, so they're taken out before the generators see the options
+        while option in argv:
+            argv.remove(option)
+            environ["FGEN_CACHE"] = value
+
     parser = XmlConfig()
     try:
-        opts, args = getopt(sys.argv[1:], parser.getShortOptions(), parser.getLongOptions())
+        opts, args = getopt(argv, parser.getShortOptions() + "r:",
+                parser.getLongOptions() + ["recursive=", "jobs=", "watch=", "merge"])
         if not opts:
             raise GetoptError("No option specified!")
-        
-        optlist = []
-        for opt in opts:
-            optlist = optlist + [x for x in opt if x]
-
-        options = parser.getOptions()
-        for option in options:
-            shortOpt = "-" + option.getShortOpt()
-            longOpt = "--" + option.getLongOpt()
-            if shortOpt in optlist or longOpt in optlist:
-                pkg = option.getPackage()
-                slotClass = option.getSlotClass()
-                instance = createGenerator(pkg, slotClass, opts, args)
-                instance.init()
-                instance.run()
-                break
+
+        jobs = 1
+        for o, a in opts:
+            if o == "--jobs":
+                if not a.isdigit() or not int(a):
+                    raise GetoptError("the number of jobs must be a positive integer")
+                jobs = int(a)
+        opts = [(o, a) for o, a in opts if o != "--jobs"]
+
+        watched = [a for o, a in opts if o == "--watch"]
+        opts = [(o, a) for o, a in opts if o != "--watch"]
+        if watched:
+            runWatch(opts, args, watched)
+            return
+
+        patterns = [a for o, a in opts if o in ("-h", "--header")]
+        directories = [a for o, a in opts if o in ("-r", "--recursive")]
+        opts = [(o, a) for o, a in opts if o not in ("-h", "--header", "-r", "--recursive")]
+        headers = findHeaders(patterns, directories)
+        if directories or len(patterns) > 1 or headers != patterns:
+            runBatch(opts, args, headers, jobs)
+        else:
+            runGenerators(opts + [("-h", x) for x in patterns], args)
     except GetoptError, ex:
         print "Error: ", ex
         sys.exit(getUsage())
 
-if __name__ == "__main__":
+def execute(argv):
+    """
+    Run fgen with the arguments, it's the entry of the command line and of fgendaemon.
+    """
     # We roll back all the generated files if get errors.
     try:
-        main()
+        main(argv)
+    except SystemExit:
+        # a generator died, e.g. on a file that exists, so the files generated by the
+        # generators before it are rolled back
+        FileDepot().removeAllFromDisk()
+        raise
     except Exception, ex:
         print "Error: ", ex
         FileDepot().removeAllFromDisk()
         print __reportTo__
+
+if __name__ == "__main__":
+    execute(sys.argv[1:])
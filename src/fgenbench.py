@@ -0,0 +1,284 @@
+# fgen is a free command line tool that facilitates cross platform
+# c++ development, including header generation, cpp file generation,
+# makefile generation, unit test framework generation, etc.
+#
+# Copyright (C) 2006 Kevin Wan <wanjunfeng@gmail.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from __future__ import with_statement
+from getopt import getopt
+from getopt import GetoptError
+from os import close
+from os import devnull
+from os import environ
+from os import path
+from os import remove
+from shutil import copy
+from shutil import rmtree
+from subprocess import call
+from tempfile import mkdtemp
+from tempfile import mkstemp
+from time import time
+import sys
+from cppheaderparser import CppHeaderParser
+from cppsource import stripComments
+from cppsource import stripMapped
+import mmap
+
+__doc__ = \
+"""
+fgenbench - benchmarks of fgen on synthetic headers.
+
+Usage: python fgenbench.py [options] benchmark [sizes]
+
+Benchmarks:
+  lines
+      parse headers of 1k, 10k, 100k and 1M lines, the time per line should stay flat
+  read
+      read a commented header of 200 MB line by line and memory mapped, sizes are in MB
+  enum
+      parse a header with an enum of 50k members, one member per line
+  generators
+      run fgen -c, -u and -d on a header of 10k lines in three processes and in one
+  startup
+      time each entry path of fgen on a tiny header, the sizes are the numbers of runs
+
+Options:
+  -e ENGINE, --engine=ENGINE
+      the engine of CppHeaderParser, tokenizer or pyparsing
+"""
+
+class NullOutput:
+    """Swallows the progress printed by CppHeaderParserTracker."""
+    def write(self, s):
+        pass
+
+def writeHeader(lines):
+    """
+    Write a synthetic header of about the given number of lines into a temporary file,
+    return its path. The header is made of classes of 10 lines each.
+    """
+    fd, header = mkstemp(".h", "fgenbench")
+    close(fd)
+    with open(header, "w") as output:
+        output.write("namespace bench\n{\n")
+        for i in xrange(max(lines / 10, 1)):
+            output.write("class Class%d\n{\npublic:\n" % i)
+            output.write("    Class%d();\n" % i)
+            output.write("    virtual ~Class%d();\n" % i)
+            output.write("    int getValue(const std::string& key) const;\n")
+            output.write("    void setValue(const std::string& key,\n")
+            output.write("                  int value);\n")
+            output.write("};\n\n")
+        output.write("}\n")
+    return header
+
+def writeCommentedHeader(megabytes):
+    """
+    Write a synthetic header of about the given size with all kinds of comments into a
+    temporary file, return its path.
+    """
+    fd, header = mkstemp(".h", "fgenbench")
+    close(fd)
+    block = "".join((
+        "/**\n",
+        " * Get the value of the key.\n",
+        " *\n",
+        " * @param key the key, see http://example.com/docs.\n",
+        " * @return the value.\n",
+        " */\n",
+        "int getValue(const char* key = \"//\") const; // inline\n",
+        "/* set the value */ void setValue(int value);\n\n"))
+    with open(header, "w") as output:
+        for i in xrange(megabytes * 1024 * 1024 / len(block)):
+            output.write(block)
+    return header
+
+def writeEnumHeader(members):
+    """
+    Write a synthetic header with one enum of the given number of members into a
+    temporary file, return its path. The enum looks like a generated table of error
+    codes, of which some initializers have commas in parentheses.
+    """
+    fd, header = mkstemp(".h", "fgenbench")
+    close(fd)
+    with open(header, "w") as output:
+        output.write("namespace bench\n{\nenum ErrorCode\n{\n")
+        for i in xrange(members):
+            if i % 10:
+                output.write("    ERROR_%d = %d,\n" % (i, i))
+            else:
+                output.write("    ERROR_%d = MAKE_CODE(%d, %d),\n" % (i, i / 10, i % 10))
+        output.write("};\n}\n")
+    return header
+
+def timeParse(header, engine):
+    stdout = sys.stdout
+    sys.stdout = NullOutput()
+    try:
+        start = time()
+        CppHeaderParser(header, engine, False).parse()
+        return time() - start
+    finally:
+        sys.stdout = stdout
+
+def benchLines(sizes, engine):
+    print "%10s %10s %14s" % ("lines", "seconds", "us per line")
+    for size in sizes:
+        header = writeHeader(size)
+        try:
+            elapsed = timeParse(header, engine)
+        finally:
+            remove(header)
+        print "%10d %10.3f %14.2f" % (size, elapsed, elapsed * 1e6 / size)
+
+def benchRead(sizes, engine):
+    print "%10s %12s %12s %10s" % ("MB", "read (s)", "mapped (s)", "speedup")
+    for size in sizes:
+        header = writeCommentedHeader(size)
+        try:
+            start = time()
+            with open(header, "rb") as lines:
+                for line in stripComments(lines):
+                    pass
+            read = time() - start
+
+            start = time()
+            with open(header, "rb") as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    for line in stripMapped(buf):
+                        pass
+                finally:
+                    buf.close()
+            mapped = time() - start
+        finally:
+            remove(header)
+        print "%10d %12.3f %12.3f %9.2fx" % (size, read, mapped, read / mapped)
+
+def benchEnum(sizes, engine):
+    print "%10s %10s %14s" % ("members", "seconds", "us per member")
+    for size in sizes:
+        header = writeEnumHeader(size)
+        try:
+            elapsed = timeParse(header, engine)
+        finally:
+            remove(header)
+        print "%10d %10.3f %14.2f" % (size, elapsed, elapsed * 1e6 / size)
+
+def runFgen(header, options, engine):
+    """
+    Run fgen with the options on a copy of the header in a temporary directory, return
+    the wall time of the run.
+    """
+    workdir = mkdtemp(prefix="fgenbench")
+    env = dict(environ)
+    if engine:
+        env["FGEN_ENGINE"] = engine
+    fgen = path.join(path.dirname(path.abspath(__file__)), "fgen.py")
+    try:
+        copy(header, path.join(workdir, "bench.h"))
+        start = time()
+        for opts in options:
+            with open(path.join(workdir, "fgen.log"), "a") as log:
+                call([sys.executable, fgen, "-h", "bench.h"] + opts, cwd=workdir,
+                        env=env, stdout=log, stderr=log)
+        return time() - start
+    finally:
+        rmtree(workdir)
+
+def benchGenerators(sizes, engine):
+    print "%10s %12s %12s %10s" % ("lines", "3 runs (s)", "1 run (s)", "saving")
+    for size in sizes:
+        header = writeHeader(size)
+        try:
+            separate = runFgen(header, [["-c"], ["-u"], ["-d"]], engine)
+            shared = runFgen(header, [["-c", "-u", "-d"]], engine)
+        finally:
+            remove(header)
+        print "%10d %12.3f %12.3f %9.0f%%" % (size, separate, shared,
+                (separate - shared) * 100 / separate)
+
+# the entry paths of fgen, the script and its arguments
+entryPaths = [
+    ("usage", "fgen.py", []),
+    ("makefile", "fgen.py", ["-m"]),
+    ("header", "fgen.py", ["-h", "new.h"]),
+    ("cpp", "fgen.py", ["-h", "bench.h", "-c"]),
+    ("all", "fgen.py", ["-h", "bench.h", "-c", "-u", "-d"]),
+    ("client", "fgenc.py", ["-h", "bench.h", "-c"])
+]
+
+def timeEntry(script, args, engine):
+    """
+    Run the script with the arguments in a temporary directory with a tiny header,
+    return the wall time of the run.
+    """
+    workdir = mkdtemp(prefix="fgenbench")
+    env = dict(environ)
+    if engine:
+        env["FGEN_ENGINE"] = engine
+    # the client falls back to run fgen in its own process
+    env["FGEN_SOCKET"] = path.join(workdir, "none.sock")
+    script = path.join(path.dirname(path.abspath(__file__)), script)
+    header = writeHeader(10)
+    try:
+        copy(header, path.join(workdir, "bench.h"))
+        with open(devnull, "r+") as null:
+            start = time()
+            call([sys.executable, script] + args, cwd=workdir, env=env,
+                    stdin=null, stdout=null, stderr=null)
+            return time() - start
+    finally:
+        remove(header)
+        rmtree(workdir)
+
+def benchStartup(sizes, engine):
+    print "%10s %12s %12s" % ("entry", "min (ms)", "median (ms)")
+    for name, script, args in entryPaths:
+        for size in sizes:
+            times = sorted([timeEntry(script, args, engine) for i in xrange(size)])
+            print "%10s %12.1f %12.1f" % (name, times[0] * 1000,
+                    times[len(times) / 2] * 1000)
+
+benchmarks = {
+    "lines": (benchLines, [1000, 10000, 100000, 1000000]),
+    "read": (benchRead, [200]),
+    "enum": (benchEnum, [50000]),
+    "generators": (benchGenerators, [10000]),
+    "startup": (benchStartup, [10])
+}
+
+def main():
+    try:
+        opts, args = getopt(sys.argv[1:], "e:", ["engine="])
+        if not args or args[0] not in benchmarks:
+            raise GetoptError("no benchmark specified")
+    except GetoptError, ex:
+        print "Error: ", ex
+        sys.exit(__doc__)
+
+    engine = None
+    for o, a in opts:
+        if o in ("-e", "--engine"):
+            engine = a
+    bench, sizes = benchmarks[args[0]]
+    if args[1:]:
+        sizes = [int(x) for x in args[1:]]
+    bench(sizes, engine)
+
+if __name__ == "__main__":
+    main()
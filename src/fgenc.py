@@ -0,0 +1,124 @@
+# fgen is a free command line tool that facilitates cross platform
+# c++ development, including header generation, cpp file generation,
+# makefile generation, unit test framework generation, etc.
+#
+# Copyright (C) 2006 Kevin Wan <wanjunfeng@gmail.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from os import environ
+from os import getcwd
+from os import path
+import marshal
+import socket
+import struct
+import sys
+
+__doc__ = \
+"""
+fgenc - the client of fgendaemon, it takes the same arguments as fgen.
+
+Usage: fgenc [options] arguments
+
+The arguments, the current directory and the FGEN_* environment variables are
+forwarded to the daemon listening on the socket, which is FGEN_SOCKET or
+~/.fgen/fgend.sock. If no daemon is listening, fgen runs in this process instead.
+A generator that reads stdin, like the prompt for the makefile of the unit tests,
+reads it from the client.
+
+The messages on the socket are marshalled tuples, each prefixed with its length. The
+client sends (argv, cwd, env), the daemon answers ("readline", output, error) for
+every line its run reads, on which the client shows the output so far and sends the
+(line,) read from its stdin, and ("exit", status, output, error) at the end.
+"""
+
+def getSocketPath():
+    socketPath = environ.get("FGEN_SOCKET")
+    if not socketPath:
+        socketPath = path.join(environ.get("HOME", ""), ".fgen", "fgend.sock")
+    return socketPath
+
+def isListening(socketPath):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socketPath)
+            return True
+        except socket.error:
+            return False
+    finally:
+        sock.close()
+
+def writeMessage(stream, message):
+    data = marshal.dumps(message)
+    stream.write(struct.pack("!I", len(data)) + data)
+    stream.flush()
+
+def readMessage(stream):
+    """
+    Return the next message on the stream, or None if the stream is closed.
+    """
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    size, = struct.unpack("!I", header)
+    return marshal.loads(stream.read(size))
+
+def call(argv, socketPath=None):
+    """
+    Run fgen with the arguments in the daemon, return the (status, output, error) tuple
+    of the run, or None if no daemon is listening on the socket. The lines the run
+    reads are read from stdin, after the output so far is written.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socketPath or getSocketPath())
+        except socket.error:
+            return None
+        rfile = sock.makefile("rb")
+        wfile = sock.makefile("wb")
+        env = dict([(k, v) for k, v in environ.items() if k.startswith("FGEN_")])
+        writeMessage(wfile, (list(argv), getcwd(), env))
+        while True:
+            message = readMessage(rfile)
+            if message == None:
+                raise EOFError("the daemon closed the connection")
+            if message[0] != "readline":
+                return message[1:]
+            output, error = message[1:]
+            sys.stdout.write(output)
+            sys.stdout.flush()
+            sys.stderr.write(error)
+            sys.stderr.flush()
+            writeMessage(wfile, (sys.stdin.readline(),))
+    finally:
+        sock.close()
+
+def main():
+    reply = call(sys.argv[1:])
+    if reply == None:
+        import fgen
+        fgen.execute(sys.argv[1:])
+        return
+
+    status, output, error = reply
+    sys.stdout.write(output)
+    sys.stderr.write(error)
+    sys.exit(status)
+
+if __name__ == "__main__":
+    main()
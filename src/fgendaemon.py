@@ -0,0 +1,179 @@
+# fgen is a free command line tool that facilitates cross platform
+# c++ development, including header generation, cpp file generation,
+# makefile generation, unit test framework generation, etc.
+#
+# Copyright (C) 2006 Kevin Wan <wanjunfeng@gmail.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from os import chdir
+from os import environ
+from os import getcwd
+from os import path
+from os import remove
+from os import umask
+from SocketServer import StreamRequestHandler
+from SocketServer import UnixStreamServer
+from StringIO import StringIO
+import signal
+import sys
+from cppheadermodel import CppHeaderModel
+from fgconfig import XmlConfig
+from filedepot import FileDepot
+import fgen
+import fgenc
+
+__doc__ = \
+"""
+fgendaemon - keeps fgen warm in a process serving the calls of fgenc over a UNIX domain
+socket.
+
+Usage: python fgendaemon.py [socket]
+
+The config, the generator modules, the grammar of the pyparsing engine and the
+declaration models of the headers stay in memory between the calls, so a call costs
+the generation only. The calls are served one by one, each in the current directory
+and with the FGEN_* environment variables of its client, and a call reads the stdin
+of its client. The config is loaded again on a call if fgen.xml has changed, and the
+models of the headers removed or changed are dropped after a call. The socket
+defaults to FGEN_SOCKET or ~/.fgen/fgend.sock.
+"""
+
+class ClientStdin:
+    """
+    The stdin of a call, the lines are read from the stdin of the client. The output of
+    the call so far, like a prompt, is sent along with the request for a line, so that
+    the client shows it before it reads.
+    """
+    def __init__(self, rfile, wfile, output, error):
+        self.__rfile = rfile
+        self.__wfile = wfile
+        self.__output = output
+        self.__error = error
+
+    def readline(self):
+        fgenc.writeMessage(self.__wfile, ("readline", self.__drain(self.__output),
+                self.__drain(self.__error)))
+        reply = fgenc.readMessage(self.__rfile)
+        # a client that's gone is the end of the input
+        return reply[0] if reply else ""
+
+    def __drain(self, buffer):
+        text = buffer.getvalue()
+        buffer.truncate(0)
+        return text
+
+class FgenRequestHandler(StreamRequestHandler):
+    def handle(self):
+        request = fgenc.readMessage(self.rfile)
+        if request == None:
+            return
+        argv, cwd, env = request
+        status, output, error = self.server.execute(argv, cwd, env, self.rfile, self.wfile)
+        fgenc.writeMessage(self.wfile, ("exit", status, output, error))
+
+class FgenDaemon(UnixStreamServer):
+    def __init__(self, socketPath):
+        if path.exists(socketPath):
+            if fgenc.isListening(socketPath):
+                raise RuntimeError("a daemon is listening on %s already" % socketPath)
+            # left by a daemon that was killed
+            remove(socketPath)
+        mask = umask(077)
+        try:
+            UnixStreamServer.__init__(self, socketPath, FgenRequestHandler)
+        finally:
+            umask(mask)
+        self.__socketPath = socketPath
+        self.__warmUp()
+
+    def execute(self, argv, cwd, env, rfile, wfile):
+        """
+        Run fgen for a client, return the (status, output, error) tuple of the run. The
+        stdin of the run is read from the client through the streams of its connection,
+        see ClientStdin.
+        """
+        saved = dict([(k, v) for k, v in environ.items() if k.startswith("FGEN_")])
+        workdir = getcwd()
+        streams = sys.stdin, sys.stdout, sys.stderr
+        output = StringIO()
+        error = StringIO()
+        status = 0
+        try:
+            self.__setEnv(env)
+            chdir(cwd)
+            sys.stdout = output
+            sys.stderr = error
+            sys.stdin = ClientStdin(rfile, wfile, output, error)
+            try:
+                XmlConfig().refresh()
+                fgen.execute(argv)
+            except SystemExit, ex:
+                if isinstance(ex.code, basestring):
+                    status = 1
+                    error.write("%s\n" % ex.code)
+                elif ex.code:
+                    status = ex.code
+            except Exception, ex:
+                # fgen.xml can't be loaded again, the call fails as fgen would
+                status = 1
+                error.write("Error: %s\n" % ex)
+        finally:
+            sys.stdin, sys.stdout, sys.stderr = streams
+            chdir(workdir)
+            self.__setEnv(saved)
+            FileDepot().clean()
+            CppHeaderModel.prune()
+        return status, output.getvalue(), error.getvalue()
+
+    def close(self):
+        self.server_close()
+        if path.exists(self.__socketPath):
+            remove(self.__socketPath)
+
+    def __setEnv(self, env):
+        for key in [k for k in environ.keys() if k.startswith("FGEN_")]:
+            del environ[key]
+        environ.update(env)
+
+    def __warmUp(self):
+        config = XmlConfig()
+        for option in config.getOptions():
+            option.getSlot()
+        from cppheadergrammar import CppHeaderGrammar
+        CppHeaderGrammar.getInstance()
+
+def main():
+    socketPath = sys.argv[1] if sys.argv[1:] else fgenc.getSocketPath()
+    daemon = FgenDaemon(socketPath)
+    # the server takes an exception raised in a call for an error of the call and goes
+    # on, so ctrl-c and kill are only noted, and the daemon stops between the calls
+    stopping = []
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda signum, frame: stopping.append(signum))
+    # handle_request returns after timeout seconds without a call to check for them
+    daemon.timeout = 0.5
+    print "fgen daemon is listening on %s" % socketPath
+    # the line tells a script that starts the daemon that it's ready
+    sys.stdout.flush()
+    try:
+        while not stopping:
+            daemon.handle_request()
+    finally:
+        daemon.close()
+
+if __name__ == "__main__":
+    main()
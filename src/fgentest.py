@@ -26,9 +26,107 @@ from sys import exit
 from os import path
 from os import system
 from os import remove
+from os import makedirs
+from os import listdir
+from os import chmod
 from shutil import copy
+from shutil import copytree
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+import select
+import signal
+from subprocess import Popen
+from subprocess import PIPE
 from fgconfig import XmlConfig
+from cppheaderparser import CACHE_VERSION
+from cppheaderparser import ENGINES
+from cppparsecache import ParseCache
+from cppheaderparser import CppHeaderParser
+from cppheaderobserver import CppHeaderObserver
+from cppheadermodel import CppHeaderModel
+import cppheadermodel
+from cppsource import stripComments
+from cppsource import stripMapped
 from templateparser import TemplateParser
+from pyparsing import alphanums, alphas, nums, CaselessKeyword, CaselessLiteral, CharsNotIn, \
+        Combine, Dict, Each, Empty, FollowedBy, Forward, Group, Keyword, LineEnd, Literal, \
+        NotAny, OneOrMore, Optional, ParseException, ParserElement, QuotedString, Regex, \
+        SkipTo, Suppress, Word, ZeroOrMore
+
+class HeaderRecorder(CppHeaderObserver):
+    def __init__(self):
+        CppHeaderObserver.__init__(self)
+        self.enums = {}
+        self.functions = []
+
+    def onEnum(self, scopes, enumName, enumMembers):
+        self.enums[enumName] = list(enumMembers)
+
+    def onFunctionDef(self, scopes, template, type, funcName, paramList, const):
+        self.onFunctionDecl(scopes, template, type, funcName, paramList, const)
+
+    def onFunctionDecl(self, scopes, template, type, funcName, paramList, const):
+        self.functions.append("::".join([x.getName() for x in scopes] + [funcName]))
+
+class EventRecorder(CppHeaderObserver):
+    """
+    Records the events with the line number, the scope names and the arguments, so that
+    the events of different parses can be compared. The arguments are described with
+    their types if typed is True, otherwise the results are plain lists, and an empty
+    result is an empty list whether the engine gives [] or ''.
+    """
+    __events = ("onMacro", "onNamespace", "onNamespaceStart", "onNamespaceEnd", "onClass",
+            "onClassStart", "onClassEnd", "onEnum", "onFunctionDef", "onFunctionDecl",
+            "onDtorDecl", "onDtorDef", "onCtorDecl", "onCtorDef")
+
+    def __init__(self, typed=True):
+        CppHeaderObserver.__init__(self)
+        self.events = []
+        self.__typed = typed
+        for name in self.__events:
+            setattr(self, name, self.__getRecorder(name))
+
+    def __getRecorder(self, name):
+        def record(scopes, *args):
+            self.events.append((name, self.__parser__.getLineNo(),
+                    [x.getName() for x in scopes], self.__describe(args)))
+        return record
+
+    def __describe(self, value):
+        if not self.__typed:
+            if hasattr(value, "__iter__"):
+                return [self.__describe(x) for x in value]
+            return value if value != "" else []
+        if hasattr(value, "__iter__"):
+            keys = hasattr(value, "keys") and sorted(value.keys()) or None
+            return (type(value), keys, [self.__describe(x) for x in value])
+        return (type(value), value)
+
+class OutputReader:
+    """
+    Reads the output of a process line by line as it comes, with a timeout.
+    """
+    def __init__(self, stream):
+        self.__fd = stream.fileno()
+        self.__buffer = ""
+
+    def readLine(self, timeout):
+        """
+        Return the next line without the line break, or None if there's none within
+        timeout seconds or the output is closed.
+        """
+        deadline = time() + timeout
+        while "\n" not in self.__buffer:
+            left = deadline - time()
+            if left <= 0 or not select.select([self.__fd], [], [], left)[0]:
+                return None
+            data = os.read(self.__fd, 4096)
+            if not data:
+                return None
+            self.__buffer += data
+        line, self.__buffer = self.__buffer.split("\n", 1)
+        return line
 
 class fgenTest(unittest.TestCase):    
     def setUp(self):
@@ -54,6 +152,523 @@ class fgenTest(unittest.TestCase):
         self.assertEquals(expected, actual)
         remove(cppFile)
 
+    def testCppPyparsingEngine(self):
+        header = path.join("test", "sample.h")
+        cppFile = path.join("test", "sample.cc")
+        cppStandard = path.join("test", "sample_standard.cc")
+
+        self.__removeOnExists(cppFile)
+        os.environ["FGEN_ENGINE"] = "pyparsing"
+        try:
+            command = r"python %s -h %s -c %s" % (self.__fgen, header, cppFile)
+            system(command)
+        finally:
+            del os.environ["FGEN_ENGINE"]
+
+        expected = self.__getFileContent(cppStandard)
+        expected = expected.replace("&date", date.today().isoformat())
+        actual = self.__getFileContent(cppFile)
+        self.assertEquals(expected, actual)
+        remove(cppFile)
+
+    def testCppNoCache(self):
+        header = path.join("test", "sample.h")
+        cppFile = path.join("test", "sample.cc")
+        cppStandard = path.join("test", "sample_standard.cc")
+
+        self.__removeOnExists(cppFile)
+        command = r"python %s --no-cache -h %s -c %s" % (self.__fgen, header, cppFile)
+        system(command)
+
+        expected = self.__getFileContent(cppStandard)
+        expected = expected.replace("&date", date.today().isoformat())
+        actual = self.__getFileContent(cppFile)
+        self.assertEquals(expected, actual)
+        remove(cppFile)
+
+    def testCppAndUnitTestClass(self):
+        header = path.join("test", "sample.h")
+        cppFile = path.join("test", "sample.cc")
+        cppStandard = path.join("test", "sample_standard.cc")
+        unitFile = path.join("test", "sampleTest.cc")
+        unitStandard = path.join("test", "sampleTest_standard.cc")
+        unitMain = path.join("test", "main.cc")
+        unitMakefile = path.join("test", "makefile")
+
+        generated = [cppFile, unitFile, unitMain, unitMakefile]
+        map(self.__removeOnExists, generated)
+        command = r"python %s -h %s -c -u" % (self.__fgen, header)
+        system(command)
+
+        expected = self.__getFileContent(cppStandard)
+        expected = expected.replace("&date", date.today().isoformat())
+        self.assertEquals(expected, self.__getFileContent(cppFile))
+        expected = self.__getFileContent(unitStandard)
+        expected = expected.replace("&date", date.today().isoformat())
+        self.assertEquals(expected, self.__getFileContent(unitFile))
+        map(self.__removeOnExists, generated)
+
+    def testCppBatch(self):
+        batchDir = path.join("test", "batch")
+        cppStandard = path.join("test", "sample_standard.cc")
+
+        if path.exists(batchDir):
+            rmtree(batchDir)
+        makedirs(path.join(batchDir, "sub"))
+        copy(path.join("test", "sample.h"), path.join(batchDir, "first.h"))
+        copy(path.join("test", "sample.h"), path.join(batchDir, "sub", "second.h"))
+        command = r"python %s -c -r %s" % (self.__fgen, batchDir)
+        system(command)
+
+        expected = self.__getFileContent(cppStandard)
+        expected = expected.replace("&date", date.today().isoformat())
+        actual = self.__getFileContent(path.join(batchDir, "first.cc"))
+        self.assertEquals(expected.replace("sample.h", "first.h"), actual)
+        actual = self.__getFileContent(path.join(batchDir, "sub", "second.cc"))
+        self.assertEquals(expected.replace("sample.h", "second.h"), actual)
+        rmtree(batchDir)
+
+    def testCppBatchJobs(self):
+        batchDir = path.join("test", "batch")
+        cppStandard = path.join("test", "sample_standard.cc")
+        expected = self.__getFileContent(cppStandard)
+        expected = expected.replace("&date", date.today().isoformat())
+
+        runs = []
+        for jobs in ("", " --jobs=2"):
+            if path.exists(batchDir):
+                rmtree(batchDir)
+            makedirs(path.join(batchDir, "sub"))
+            copy(path.join("test", "sample.h"), path.join(batchDir, "first.h"))
+            copy(path.join("test", "sample.h"), path.join(batchDir, "sub", "second.h"))
+            # second.h fails since its cpp file is there already
+            with open(path.join(batchDir, "sub", "second.cc"), "w") as f:
+                f.write("existing\n")
+            command = r"python %s -c -r %s%s" % (self.__fgen, batchDir, jobs)
+            process = Popen(command, shell=True, stdout=PIPE)
+            output = process.communicate()[0]
+            # the parsing traces and the pipeline stats aren't the same for the runs
+            results = [x for x in output.splitlines() if x.startswith("\t")
+                    or x.endswith("failed")]
+            runs.append((process.returncode, results))
+
+            actual = self.__getFileContent(path.join(batchDir, "first.cc"))
+            self.assertEquals(expected.replace("sample.h", "first.h"), actual)
+            actual = self.__getFileContent(path.join(batchDir, "sub", "second.cc"))
+            self.assertEquals("existing\n", actual)
+            rmtree(batchDir)
+
+        self.assertEquals(1, runs[0][0])
+        self.assertEquals(["\t%s\t\t\t\t[OK]" % path.join(batchDir, "first.cc"),
+                "2 headers, 1 succeeded, 1 failed",
+                "\t%s\t\t\t\t[FAILED] Error: %s already exists!" % (
+                    path.join(batchDir, "sub", "second.h"),
+                    path.join(batchDir, "sub", "second.cc"))], runs[0][1])
+        self.assertEquals(runs[0], runs[1])
+
+    def testCorruptParseCache(self):
+        header = path.join("test", "sample.h")
+        cppFile = path.join("test", "sample.cc")
+        cppStandard = path.join("test", "sample_standard.cc")
+        home = self.__makeHome()
+        cache = ParseCache(path.join(home, ".fgen", "cache"))
+        key = cache.getKey(header, "tokenizer", CACHE_VERSION)
+        entry = path.join(home, ".fgen", "cache", key + ".pickle")
+
+        expected = self.__getFileContent(cppStandard)
+        expected = expected.replace("&date", date.today().isoformat())
+        command = r"python %s --cache -h %s -c %s" % (self.__fgen, header, cppFile)
+        saved = os.environ["HOME"]
+        os.environ["HOME"] = home
+        try:
+            # a pickle of a missing class, a truncated pickle and garbage
+            for garbage in ("cfgentest_no_module\nEntry\n.", "(lp0\nI1\naI2", "\x80\x02garbage"):
+                self.__removeOnExists(cppFile)
+                system(command)
+                with open(entry, "wb") as f:
+                    f.write(garbage)
+                self.__removeOnExists(cppFile)
+                system(command)
+
+                self.assertEquals(expected, self.__getFileContent(cppFile))
+                # the entry is parsed and cached again
+                self.assertNotEquals(None, cache.load(key))
+        finally:
+            os.environ["HOME"] = saved
+            rmtree(home)
+        remove(cppFile)
+
+    def testParseCacheReplay(self):
+        header = path.join("test", "sample.h")
+        home = self.__makeHome()
+        cacheDir = path.join(home, ".fgen", "cache")
+        saved = os.environ["HOME"]
+        os.environ["HOME"] = home
+        try:
+            for engine in ENGINES:
+                # parsed, parsed and cached, replayed
+                runs = [self.__recordEvents(header, engine, cache) for cache in (False, True, True)]
+                self.assertEquals(runs[0], runs[1])
+                self.assertEquals(runs[0], runs[2])
+            self.assertEquals(len(ENGINES), len(listdir(cacheDir)))
+
+            # a cache that others can write is not trusted
+            cache = ParseCache(cacheDir)
+            key = cache.getKey(header, "tokenizer", CACHE_VERSION)
+            self.assertNotEquals(None, cache.load(key))
+            chmod(cacheDir, 0777)
+            self.assertEquals(None, cache.load(key))
+            cache.store("other", [])
+            self.assertEquals(len(ENGINES), len(listdir(cacheDir)))
+        finally:
+            os.environ["HOME"] = saved
+            rmtree(home)
+
+    def testEnginesAgree(self):
+        headers = [path.join("test", x) for x in sorted(listdir("test")) if x.endswith(".h")]
+        for header in headers:
+            events = [(header, self.__recordEvents(header, engine, typed=False))
+                    for engine in ENGINES]
+            self.assertEquals(events[0], events[1])
+
+    def testTryMatch(self):
+        for expr, text in self.__getTryMatchCases():
+            self.__assertTryMatch(expr, text)
+
+        # the elements with debug actions or fail actions, and packrat parsing, fall back
+        # to the raising path
+        calls = []
+        record = lambda *args: calls.append(args)
+        for expr, text in self.__getTryMatchCases():
+            expr.setDebugActions(record, record, record)
+            self.__assertTryMatch(expr, text)
+        self.assert_(calls)
+
+        del calls[:]
+        for expr, text in self.__getTryMatchCases():
+            expr.setFailAction(record)
+            self.__assertTryMatch(expr, text)
+            # an inner element falls back on its own
+            self.__assertTryMatch(Word(alphas) + expr, "a " + text)
+        self.assert_(calls)
+
+        ParserElement.enablePackrat()
+        try:
+            for expr, text in self.__getTryMatchCases():
+                self.__assertTryMatch(expr, text)
+        finally:
+            ParserElement._packratEnabled = False
+            ParserElement._parse = ParserElement._parseNoCache
+            ParserElement.resetCache()
+
+    def __getTryMatchCases(self):
+        """
+        Return the (expression, text) pairs covering the elements of pyparsing, with
+        matches and misses at various locations. The expressions are created on each
+        call, so that the fallback paths can be set on them.
+        """
+        name = Word(alphas, alphanums + "_")
+        number = Word(nums)
+        upper = Word(alphas).setParseAction(lambda s, loc, toks: [toks[0].upper()])
+        def rejectX(s, loc, toks):
+            if toks[0] == "x":
+                raise ParseException(s, loc, "x is rejected")
+        picky = Word(alphas).setParseAction(rejectX)
+        nested = Forward()
+        nested << (number | "(" + nested + ")")
+        return [
+            (Literal("ab"), "ab abc a b"),
+            (Keyword("if"), "if iffy if_ aif (if)"),
+            (CaselessLiteral("ab"), "AB aB b"),
+            (CaselessKeyword("if"), "IF iFfy aIf If"),
+            (number, "12 ab 345"),
+            (Word("a", max=2), "aaa a b"),
+            (Regex(r"[a-z]+\d"), "ab1 c 2 d3"),
+            (Regex(r"(?P<word>[a-z]+)(?P<digit>\d)"), "ab1 c 2 d3"),
+            (name + number, "a 1 b c 2 3"),
+            (name ^ name + number ^ number, "a 1 b 2 -"),
+            (number | name + number | name, "a 1 b 2 -"),
+            (name + Optional(number), "a 1 b c -"),
+            (name + ZeroOrMore(number), "a 1 2 b c 3 -"),
+            (name + OneOrMore(number), "a 1 2 b c 3 -"),
+            (name + FollowedBy(number), "a 1 b c 2"),
+            (NotAny(number) + name, "1 a 2b"),
+            (SkipTo(";") + ";", "a b; c"),
+            (SkipTo(Literal(";"), include=True), "a b; c;"),
+            (Combine(name + "." + name), "a.b a . b c.d"),
+            (Group(name + number), "a 1 b c 2"),
+            (Suppress(name) + number, "a 1 2 b 3"),
+            (Dict(OneOrMore(Group(name + number))), "a 1 b 2 c d 3"),
+            (name.setResultsName("name") + number.setResultsName("number"), "a 1 b c 2"),
+            (upper, "a b1 -"),
+            (picky, "a x b"),
+            (nested, "(1) ((2)) (3 -"),
+            (Empty() + name, "a - b"),
+            (CharsNotIn(",;"), "ab,c;;d"),
+            (QuotedString('"'), 'a "b" "c'),
+            (name & number, "a 1 2 b - c"),
+            (name + LineEnd(), "a\nb c"),
+        ]
+
+    def __assertTryMatch(self, expr, text):
+        """
+        Assert that tryMatch gives what parseString gives at the start of the text, and
+        that scanning the text with tryMatch finds the matches and the positions that
+        scanString finds.
+        """
+        match = expr.tryMatch(text)
+        try:
+            expected = expr.parseString(text)
+        except ParseException:
+            self.assertEquals((str(expr), text, None), (str(expr), text, match))
+        else:
+            self.assertEquals((str(expr), text, self.__dumpResults(expected)),
+                    (str(expr), text, match and self.__dumpResults(match[1])))
+
+        expected = [(self.__dumpResults(tokens), start, end)
+                for tokens, start, end in expr.scanString(text)]
+        matches = []
+        loc = 0
+        while loc <= len(text):
+            preloc = expr.preParse(text, loc)
+            match = expr.tryMatch(text, preloc)
+            if match is None:
+                loc = preloc + 1
+            else:
+                matches.append((self.__dumpResults(match[1]), preloc, match[0]))
+                loc = match[0]
+        self.assertEquals((str(expr), text, expected), (str(expr), text, matches))
+
+    def __dumpResults(self, results):
+        return (results.asList(), results.dump())
+
+    def __recordEvents(self, header, engine, cache=False, typed=True):
+        recorder = EventRecorder(typed)
+        parser = CppHeaderParser(header, engine, cache)
+        recorder.setParser(parser)
+        parser.addObserver(recorder)
+        parser.parse()
+        return recorder.events
+
+    def testCppOperatorsInDefaults(self):
+        header = path.join("test", "split.h")
+        cppFile = path.join("test", "split.cc")
+        cppStandard = path.join("test", "split_standard.cc")
+
+        self.__removeOnExists(cppFile)
+        command = r"python %s --no-cache -h %s -c" % (self.__fgen, header)
+        system(command)
+
+        expected = self.__getFileContent(cppStandard)
+        expected = expected.replace("&date", date.today().isoformat())
+        actual = self.__getFileContent(cppFile)
+        self.assertEquals(expected, actual)
+        remove(cppFile)
+
+    def testCppMergeOperatorsInDefaults(self):
+        header = path.join("test", "split.h")
+        cppFile = path.join("test", "split.cc")
+        # the '<' in the default value kept by the definition of g is not a bracket
+        content = "namespace split\n{\n\n" \
+                "void Split::f(int a, int b)\n{\n}\n\n" \
+                "void Split::g(int a = x < y, int b)\n{\n}\n\n" \
+                "void Split::h(const std::map<int, int>& m, int c, int d)\n{\n}\n\n}\n"
+        with open(cppFile, "w") as f:
+            f.write(content)
+        command = r"python %s --no-cache -h %s -c --merge" % (self.__fgen, header)
+        system(command)
+        self.assertEquals(content, self.__getFileContent(cppFile))
+        remove(cppFile)
+
+    def testCppMergeNamespaces(self):
+        header = path.join("test", "using.h")
+        cppFile = path.join("test", "using.cc")
+        command = r"python %s --no-cache --merge -h %s -c %s" % (self.__fgen, header, cppFile)
+        # the definitions in another namespace or at the top aren't the ones of a::Foo
+        content = "#include \"using.h\"\n\n" \
+                "namespace b\n{\n\nvoid Foo::bar()\n{\n}\n\n}\n\n" \
+                "int Foo::baz(int n) const\n{\n    return n;\n}\n"
+        stubs = "\nnamespace a\n{\n\nvoid Foo::bar()\n{\n}\n\n" \
+                "int Foo::baz(int n) const\n{\n}\n\n}\n"
+        usings = ["#include \"using.h\"\n\nusing namespace a;\n\n" \
+                "void Foo::bar()\n{\n}\n\nint a::Foo::baz(int n) const\n{\n    return n;\n}\n",
+                "#include \"using.h\"\n\nusing a::Foo;\n\nvoid Foo::bar()\n{\n}\n\n" \
+                "namespace a\n{\n\nint Foo::baz(int n) const\n{\n    return n;\n}\n\n}\n"]
+        for original, merged in [(content, content + stubs)] + zip(usings, usings):
+            with open(cppFile, "w") as f:
+                f.write(original)
+            system(command)
+            self.assertEquals(merged, self.__getFileContent(cppFile))
+        remove(cppFile)
+
+    def testEnumMembers(self):
+        self.assertEquals(self.__getEnums("tokenizer"), {
+            "Flags": ["A", "B", "C"],
+            "Cmp": ["X", "Y", "Z"],
+            "Masks": ["M1", "M2", "M3", "M4"]})
+
+    def testEnumMembersPyparsingEngine(self):
+        self.assertEquals(self.__getEnums("pyparsing"), {
+            "Flags": ["A", "B", "C"],
+            "Cmp": ["X", "Y", "Z"],
+            "Masks": ["M1", "M2", "M3", "M4"]})
+
+    def testStatementsWithLiterals(self):
+        header = path.join("test", "statements.h")
+        # the parentheses and the terminators in the literals don't end the statements
+        for engine in ("tokenizer", "pyparsing"):
+            recorder = self.__parseHeader(header, engine)
+            self.assertEquals(["statements::Open::open", "statements::Open::close",
+                    "statements::Split::split", "statements::After::after"],
+                    recorder.functions)
+
+    def testCommentMarkersInLiterals(self):
+        header = path.join("test", "literals.h")
+        cppFile = path.join("test", "literals.cc")
+        cppStandard = path.join("test", "literals_standard.cc")
+
+        self.__removeOnExists(cppFile)
+        command = r"python %s --no-cache -h %s -c" % (self.__fgen, header)
+        system(command)
+
+        expected = self.__getFileContent(cppStandard)
+        expected = expected.replace("&date", date.today().isoformat())
+        actual = self.__getFileContent(cppFile)
+        self.assertEquals(expected, actual)
+        remove(cppFile)
+
+        # the memory mapped reading of the large headers strips the same
+        with open(header, "rb") as lines:
+            expected = list(stripComments(lines))
+        self.assertEquals(expected, list(stripMapped(self.__getFileContent(header))))
+
+    def testInlineBodies(self):
+        header = path.join("test", "inline.h")
+        # the inline bodies are skipped up to their matching braces, the braces in the
+        # literals and the comments don't count
+        for engine in ("tokenizer", "pyparsing"):
+            recorder = self.__parseHeader(header, engine)
+            self.assertEquals(["inlines::Inline::nested", "inlines::Inline::braceLiterals",
+                    "inlines::Inline::braceComments", "inlines::Inline::oneLine",
+                    "inlines::Inline::sameLine", "inlines::Inline::after",
+                    "inlines::After::afterAll"], recorder.functions)
+
+    def testCppMerge(self):
+        header = path.join("test", "sample.h")
+        cppFile = path.join("test", "sample.cc")
+        cppStandard = path.join("test", "sample_standard.cc")
+        mergeStandard = path.join("test", "sample_merge_standard.cc")
+        stub = "Sample::Sample()\n{\n}\n\n"
+
+        original = self.__getFileContent(cppStandard)
+        original = original.replace("&date", date.today().isoformat())
+        with open(cppFile, "w") as f:
+            f.write(original.replace(stub, ""))
+        command = r"python %s --merge -h %s -c" % (self.__fgen, header)
+        system(command)
+
+        expected = self.__getFileContent(mergeStandard)
+        expected = expected.replace("&date", date.today().isoformat())
+        actual = self.__getFileContent(cppFile)
+        self.assertEquals(expected, actual)
+        # nothing is missing any more, so merging again changes nothing
+        system(command)
+        self.assertEquals(actual, self.__getFileContent(cppFile))
+        remove(cppFile)
+
+    def testUnitTestMerge(self):
+        header = path.join("test", "sample.h")
+        unitFile = path.join("test", "sampleTest.cc")
+        unitOriginal = path.join("test", "sampleTest_merge.cc")
+        unitStandard = path.join("test", "sampleTest_merge_standard.cc")
+
+        # the original misses testPrint and has a test of its own, testCopy
+        original = self.__getFileContent(unitOriginal)
+        with open(unitFile, "w") as f:
+            f.write(original.replace("&date", date.today().isoformat()))
+        command = r"python %s --merge -h %s -u %s" % (self.__fgen, header, unitFile)
+        system(command)
+
+        expected = self.__getFileContent(unitStandard)
+        expected = expected.replace("&date", date.today().isoformat())
+        actual = self.__getFileContent(unitFile)
+        self.assertEquals(expected, actual)
+        system(command)
+        self.assertEquals(actual, self.__getFileContent(unitFile))
+        remove(unitFile)
+
+    def testWatchDoc(self):
+        watchDir = path.join("test", "watch")
+        header = path.join(watchDir, "a.h")
+        if path.exists(watchDir):
+            rmtree(watchDir)
+        makedirs(watchDir)
+        copy(path.join("test", "sample.h"), header)
+        command = ["python", self.__fgen, "--watch=%s" % watchDir, "-d"]
+        process = Popen(command, stdout=PIPE)
+        output = OutputReader(process.stdout)
+
+        def waitForRun():
+            # the line of a run ends with the milliseconds it took
+            while True:
+                line = output.readLine(60)
+                if line == None or line.endswith(" ms"):
+                    return line
+
+        runs = []
+        try:
+            # it's watching once it says so
+            output.readLine(60)
+            for i in range(2):
+                with open(header, "a") as f:
+                    f.write("// edited\n")
+                runs.append(waitForRun())
+            # -d writes the header and its backup, neither of which is a change to
+            # generate, or a run of a.h would come before the one of b.h
+            copy(path.join("test", "sample.h"), path.join(watchDir, "b.h"))
+            runs.append(waitForRun())
+        finally:
+            os.kill(process.pid, signal.SIGTERM)
+            process.wait()
+
+        self.assertEquals([header, header, path.join(watchDir, "b.h")],
+                [x and x.split()[0] for x in runs])
+        self.assertEquals([".a.h", ".b.h", "a.h", "b.h"], sorted(listdir(watchDir)))
+        rmtree(watchDir)
+
+    def testCorruptConfigCache(self):
+        header = path.join("test", "sample.h")
+        cppFile = path.join("test", "sample.cc")
+        cppStandard = path.join("test", "sample_standard.cc")
+        expected = self.__getFileContent(cppStandard)
+        expected = expected.replace("&date", date.today().isoformat())
+        command = r"python %s -h %s -c %s" % (self.__fgen, header, cppFile)
+
+        home = self.__makeHome()
+        configPath = path.join(home, ".fgen")
+        cacheFile = path.join(configPath, "fgen.xml.cache")
+        saved = os.environ["HOME"]
+        os.environ["HOME"] = home
+        try:
+            self.__removeOnExists(cppFile)
+            with open(cacheFile, "w") as f:
+                f.write("corrupt")
+            system(command)
+            self.assertEquals(expected, self.__getFileContent(cppFile))
+            self.assertNotEquals("corrupt", self.__getFileContent(cacheFile))
+
+            # a cache that can't be written leaves no temporary file behind
+            remove(cppFile)
+            remove(cacheFile)
+            makedirs(cacheFile)
+            system(command)
+            self.assertEquals(expected, self.__getFileContent(cppFile))
+            self.assertEquals([], [x for x in listdir(configPath) if x.endswith(".tmp")])
+        finally:
+            os.environ["HOME"] = saved
+            rmtree(home)
+        remove(cppFile)
+
     def testHeader(self):
         header = path.join("test", "headertest.h")
         headerStandard = path.join("test", "headertest_standard.h")
@@ -111,6 +726,26 @@ class fgenTest(unittest.TestCase):
         self.assertEquals(expected, actual)
         remove(header)
 
+    def testDocSameLine(self):
+        oheader = path.join("test", "sameline.h")
+        header = path.join("test", "sameline_doc.h")
+        docStandard = path.join("test", "sameline_doc_standard.h")
+
+        # only the first declaration on a line is documented, and the ones after the
+        # line still are
+        expected = self.__getFileContent(docStandard)
+        command = r"python %s -h %s -d" % (self.__fgen, header)
+        for engine in ENGINES:
+            copy(oheader, header)
+            os.environ["FGEN_ENGINE"] = engine
+            try:
+                system(command)
+            finally:
+                del os.environ["FGEN_ENGINE"]
+            self.assertEquals(expected, self.__getFileContent(header))
+            remove(header)
+            remove(path.join("test", ".sameline_doc.h"))
+
     def testUnitTestMain(self):
         unitMain = path.join("test", "main.cc")
         unitMainStandard = path.join("test", "main_standard.cc")
@@ -135,6 +770,153 @@ class fgenTest(unittest.TestCase):
         self.assertEquals(expected, actual)
         remove(unitMakefile)
 
+    def testTemplateVariables(self):
+        template = path.join(self.__config.getConfigPath(), "adjacent.test")
+        output = path.join("test", "adjacent.h")
+        self.__removeOnExists(output)
+        with open(template, "w") as f:
+            f.write("${author}${date} ${author}-${unit_test_dir}${date}\n"
+                    "${wrapper}${wrapper}${author}${AUTHOR}\n")
+        try:
+            parser = TemplateParser("adjacent.test", output)
+            parser.parse()
+        finally:
+            remove(template)
+
+        author = self.__config.getAuthor()
+        today = date.today().isoformat()
+        wrapper = "%sADJACENT" % (self.__config.getWrapperPrefix() or "")
+        expected = "%s%s %s-%s%s\n%s%s%s%s\n" % (author, today, author,
+                self.__config.getUnitTestDir(), today, wrapper, wrapper, author, author)
+        self.assertEquals(expected, self.__getFileContent(output))
+        remove(output)
+
+    def testDaemon(self):
+        home = path.abspath(path.join("test", "home"))
+        configPath = path.join(home, ".fgen")
+        workDir = path.join(home, "work")
+        socketDir = mkdtemp()
+        env = dict(os.environ)
+        env["HOME"] = home
+        env["FGEN_SOCKET"] = path.join(socketDir, "fgend.sock")
+        if path.exists(home):
+            rmtree(home)
+        copytree(self.__config.getConfigPath(), configPath)
+        makedirs(workDir)
+        copy(path.join("test", "sample.h"), workDir)
+        # the makefile of the unit tests asks for the file with the main function
+        with open(path.join(configPath, "makefile.test"), "w") as f:
+            f.write("SRC     = main.cc\n")
+        fgenc = path.abspath("fgenc.py")
+        daemon = Popen(["python", "fgendaemon.py"], env=env, stdout=PIPE)
+        try:
+            # the daemon is ready once it tells where it's listening
+            daemon.stdout.readline()
+            client = Popen(["python", fgenc, "-u", "-h", "sample.h"], cwd=workDir, env=env,
+                    stdin=PIPE, stdout=PIPE, stderr=PIPE)
+            output, error = client.communicate("main.cc\n")
+            self.assertEquals(0, client.returncode)
+            self.assertEquals("Which file contains main function in current dir: ", error)
+            self.assertEquals("SRC     = main.cc\n"
+                    "SRC     += $(filter-out ../main.cc, $(wildcard ../*.cc))\n",
+                    self.__getFileContent(path.join(workDir, "test", "makefile")))
+
+            # the daemon loads fgen.xml again once it's changed, the size changes too in
+            # case the mtime doesn't
+            xmlFile = path.join(configPath, "fgen.xml")
+            content = self.__getFileContent(xmlFile)
+            with open(xmlFile, "w") as f:
+                f.write(content.replace("<unit_test_dir>%s</unit_test_dir>" %
+                        self.__config.getUnitTestDir(), "<unit_test_dir>units</unit_test_dir>"))
+            client = Popen(["python", fgenc, "-u", "-h", "sample.h"], cwd=workDir, env=env,
+                    stdin=PIPE, stdout=PIPE, stderr=PIPE)
+            output, error = client.communicate("\n")
+            self.assertEquals(0, client.returncode)
+            self.assertEquals("SRC     = main.cc\nSRC     += $(wildcard ../*.cc)\n",
+                    self.__getFileContent(path.join(workDir, "units", "makefile")))
+            self.assert_(path.exists(path.join(workDir, "units", "sampleTest.cc")))
+        finally:
+            os.kill(daemon.pid, signal.SIGTERM)
+            daemon.wait()
+            rmtree(home)
+            rmtree(socketDir)
+
+    def testTemplateUnknownVariable(self):
+        template = path.join(self.__config.getConfigPath(), "unknown.test")
+        output = path.join("test", "unknown.h")
+        self.__removeOnExists(output)
+        with open(template, "w") as f:
+            f.write("${author} ${no_such_setting}\n")
+        try:
+            parser = TemplateParser("unknown.test", output)
+            self.assertRaises(ValueError, parser.parse)
+        finally:
+            remove(template)
+        # nothing is written since the template is rendered before the output is opened
+        self.failIf(path.exists(output))
+
+    def testModelCache(self):
+        modelDir = path.join("test", "models")
+        if path.exists(modelDir):
+            rmtree(modelDir)
+        makedirs(modelDir)
+        headers = [path.join(modelDir, "%s.h" % x) for x in "abc"]
+        for header in headers:
+            copy(path.join("test", "sample.h"), header)
+        size = cppheadermodel.MODEL_CACHE_SIZE
+        cppheadermodel.MODEL_CACHE_SIZE = 2
+        CppHeaderModel.clear()
+        try:
+            a = CppHeaderModel.getModel(headers[0])
+            b = CppHeaderModel.getModel(headers[1])
+            self.assert_(a is CppHeaderModel.getModel(headers[0]))
+            # c drops b, the least recently used one
+            CppHeaderModel.getModel(headers[2])
+            self.assert_(a is CppHeaderModel.getModel(headers[0]))
+            self.failIf(b is CppHeaderModel.getModel(headers[1]))
+
+            # the model of a removed header is dropped, the header put back with the same
+            # stamp is modeled again
+            a = CppHeaderModel.getModel(headers[0])
+            st = os.stat(headers[0])
+            remove(headers[0])
+            CppHeaderModel.prune()
+            copy(path.join("test", "sample.h"), headers[0])
+            os.utime(headers[0], (st.st_atime, st.st_mtime))
+            self.failIf(a is CppHeaderModel.getModel(headers[0]))
+            # the models of the unchanged headers are kept
+            a = CppHeaderModel.getModel(headers[0])
+            CppHeaderModel.prune()
+            self.assert_(a is CppHeaderModel.getModel(headers[0]))
+        finally:
+            cppheadermodel.MODEL_CACHE_SIZE = size
+            CppHeaderModel.clear()
+            rmtree(modelDir)
+
+    def __makeHome(self):
+        """
+        Return a temporary HOME with a copy of the config files, so that a test can
+        change the config and the caches under it without touching the real ones.
+        """
+        home = mkdtemp()
+        configPath = path.join(home, ".fgen")
+        makedirs(configPath)
+        source = self.__config.getConfigPath()
+        for name in listdir(source):
+            if path.isfile(path.join(source, name)):
+                copy(path.join(source, name), configPath)
+        return home
+
+    def __getEnums(self, engine):
+        return self.__parseHeader(path.join("test", "split.h"), engine).enums
+
+    def __parseHeader(self, header, engine):
+        recorder = HeaderRecorder()
+        parser = CppHeaderParser(header, engine, False)
+        parser.addObserver(recorder)
+        parser.parse()
+        return recorder
+
     def __getFileContent(self, filepath):
         with open(filepath) as f:
             return f.read()
@@ -0,0 +1,214 @@
+# fgen is a free command line tool that facilitates cross platform
+# c++ development, including header generation, cpp file generation,
+# makefile generation, unit test framework generation, etc.
+#
+# Copyright (C) 2006 Kevin Wan <wanjunfeng@gmail.com>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from os import path
+from os import read
+from os import stat
+from os import walk
+from time import sleep
+from time import time
+import select
+import struct
+import sys
+from fgutils import isHeader
+
+__doc__ = \
+"""
+fgenwatch module watches the trees of headers for fgen --watch. The headers written
+or moved into the trees are reported in batches, the events of a batch come within
+DEBOUNCE seconds of each other, so a header saved several times at once is reported
+once. The headers whose names start with a dot, like the backups of fgen -d, aren't
+watched. inotify is used on Linux, the trees are polled every POLL_INTERVAL seconds
+elsewhere.
+"""
+
+DEBOUNCE = 0.2
+POLL_INTERVAL = 1.0
+
+def isWatched(name):
+    return isHeader(name) and not name.startswith(".")
+
+def getStamp(header):
+    """
+    Return the mtime and the size of the header, or None if it doesn't exist.
+    """
+    try:
+        st = stat(header)
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+class HeaderWatcher:
+    """
+    The base class of the watchers, the subclass implements readChanges.
+    """
+    def wait(self):
+        """
+        Wait for the headers to change, return the sorted paths of the changed headers
+        and the time when the first change was seen.
+        """
+        changed = set()
+        while not changed:
+            changed.update(self.readChanges(None))
+        detected = time()
+        while True:
+            more = self.readChanges(DEBOUNCE)
+            if not more:
+                break
+            changed.update(more)
+        return sorted(changed), detected
+
+    def readChanges(self, timeout):
+        """
+        Return the set of the headers changed since the last call, wait at most timeout
+        seconds for a change, or a while if timeout is None.
+        """
+        raise NotImplementedError("the subclass didn't implement this function")
+
+class PollingWatcher(HeaderWatcher):
+    """
+    This class finds the changed headers by comparing the mtime and the size of the
+    headers in the trees with those of the last scan.
+    """
+    def __init__(self, directories):
+        self.__directories = directories
+        self.__stamps = self.__scan()
+
+    def readChanges(self, timeout):
+        sleep(POLL_INTERVAL if timeout is None else timeout)
+        stamps = self.__scan()
+        changed = set([header for header, stamp in stamps.iteritems()
+                if self.__stamps.get(header) != stamp])
+        self.__stamps = stamps
+        return changed
+
+    def __scan(self):
+        stamps = {}
+        for directory in self.__directories:
+            for root, dirs, files in walk(directory):
+                for name in files:
+                    if isWatched(name):
+                        header = path.join(root, name)
+                        stamp = getStamp(header)
+                        # None if it's removed during the scan
+                        if stamp != None:
+                            stamps[header] = stamp
+        return stamps
+
+class InotifyWatcher(HeaderWatcher):
+    """
+    This class gets the changed headers from inotify, through the libc functions
+    called by ctypes. Every directory of the trees is watched, including the ones
+    created later.
+    """
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_ISDIR = 0x40000000
+    __eventHeader = struct.Struct("iIII")
+
+    def __init__(self, libc, directories):
+        self.__libc = libc
+        self.__fd = libc.inotify_init()
+        if self.__fd < 0:
+            raise OSError("inotify_init failed")
+        self.__dirs = {}
+        for directory in directories:
+            self.__addTree(directory)
+
+    def readChanges(self, timeout):
+        readable = select.select([self.__fd], [], [], timeout)[0]
+        if not readable:
+            return set()
+        changed = set()
+        data = read(self.__fd, 65536)
+        size = self.__eventHeader.size
+        pos = 0
+        while pos < len(data):
+            wd, mask, cookie, length = self.__eventHeader.unpack_from(data, pos)
+            name = data[pos + size:pos + size + length].rstrip("\0")
+            pos += size + length
+            if wd not in self.__dirs or not name:
+                continue
+            filepath = path.join(self.__dirs[wd], name)
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    # the headers already in a new directory count as changed
+                    changed.update(self.__addTree(filepath))
+            elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO) and isWatched(name):
+                changed.add(filepath)
+        return changed
+
+    def __addTree(self, directory):
+        """
+        Watch the directory and the directories under it, return the headers in them.
+        """
+        headers = []
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        for root, dirs, files in walk(directory):
+            wd = self.__libc.inotify_add_watch(self.__fd, root, mask)
+            if wd >= 0:
+                self.__dirs[wd] = root
+            headers.extend([path.join(root, name) for name in files if isWatched(name)])
+        return headers
+
+def createWatcher(directories):
+    """
+    Return an InotifyWatcher of the directories if the libc supports inotify, or a
+    PollingWatcher of them.
+    """
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c"))
+        return InotifyWatcher(libc, directories)
+    except (ImportError, OSError, AttributeError):
+        return PollingWatcher(directories)
+
+def watch(directories, generate):
+    """
+    Call generate with each changed header of the trees, and print how long it took
+    from seeing the change to the end of the generation. generate returns the error of
+    the header, or None if it succeeds. It never returns, stop it by ctrl-c.
+
+    A generator may write the header, like fgen -d does, so the stamp of a header is
+    kept after it's generated, and the change of the header is its own write as long
+    as the stamp stays the same. Otherwise the write would trigger the next run.
+    """
+    watcher = createWatcher(directories)
+    print "Watching %s by %s..." % (", ".join(directories), watcher.__class__.__name__)
+    sys.stdout.flush()
+    generated = {}
+    while True:
+        headers, detected = watcher.wait()
+        for header in headers:
+            stamp = getStamp(header)
+            if stamp != None and stamp == generated.get(header):
+                continue
+            error = generate(header)
+            generated[header] = getStamp(header)
+            elapsed = (time() - detected) * 1000
+            if error == None:
+                print "\t%s\t\t\t\t[OK] %.0f ms" % (header, elapsed)
+            else:
+                print "\t%s\t\t\t\t[FAILED] %s" % (header, error)
+            # the output is read as it comes when it's piped, e.g. to a log
+            sys.stdout.flush()
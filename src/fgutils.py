@@ -21,6 +21,11 @@
 from sys import exit
 from os import path
 
+HEADER_SUFFIXES = (".h", ".hh", ".hpp", ".hxx")
+
 def dieOnExists(filepath):
     if path.exists(filepath):
         exit("Error: " + filepath + " already exists!")
+
+def isHeader(filepath):
+    return path.splitext(filepath)[1] in HEADER_SUFFIXES
@@ -26,8 +26,9 @@ class FileDepot:
     __files = None
 
     def __init__(self):
-        if not self.__files:
-            self.__files = []
+        # the files of all the generators of a run are rolled back together
+        if FileDepot.__files is None:
+            FileDepot.__files = []
 
     def add(self, filepath):
         self.__files.append(filepath)
@@ -39,10 +40,10 @@ class FileDepot:
         del self.__files[:]
 
     def removeAllFromDisk(self):
-        if not self.__files:
+        if self.__files:
             print "Rolling back..."
 
         for filepath in self.__files:
-            if path.exists(file):
+            if path.exists(filepath):
                 rmtree(filepath) if path.isdir(filepath) else remove(filepath)
         self.clean()
@@ -34,6 +34,13 @@ class FileGenerator:
     def run(self):
         raise NotImplementedError("the subclass didn't implement this function")
 
+    def prepare(self):
+        """
+        Generate the files shared by all the headers of a batch run, before the headers
+        are generated in parallel.
+        """
+        pass
+
     def __getOptArg__(self, opt):
         for o, a in self.__opts__:
             if o in opt:
@@ -1,7 +1,7 @@
 #!/bin/tcsh
 
 rm -rf dist
-python freeze.py -o dist fgen.py cppgen.py cppheadergen.py cppheaderobserver.py cppheaderparser.py cppheaderparsertracker.py cppunitgen.py docgen.py fgconfig.py fgutils.py filedepot.py filegenerator.py makefilegen.py pyparsing.py templateparser.py
+python freeze.py -o dist fgen.py cppgen.py cppheadergen.py cppheadergrammar.py cppheadermodel.py cppheaderobserver.py cppheaderparser.py cppheaderparsertracker.py cppmerge.py cppparsecache.py cppsource.py cppunitgen.py cpptokenizer.py docgen.py fgconfig.py fgenwatch.py fgutils.py filedepot.py filegenerator.py makefilegen.py pyparsing.py templateparser.py
 cd dist
 make
 strip fgen
@@ -247,6 +247,21 @@ class ParseResults(object):
         if isinstance(sub,ParseResults):
             sub.__parent = self
         
+    # pickle support, so that parse results can be cached between runs;
+    # the state is restored after the object is memoized, which keeps the
+    # parent links of nested results intact
+    def __getnewargs__( self ):
+        return ( [], )
+
+    def __getstate__( self ):
+        return ( self.__toklist, self.__tokdict, self.__name, self.__parent,
+                 self.__accumNames )
+
+    def __setstate__( self, state ):
+        self.__doinit = False
+        self.__toklist, self.__tokdict, self.__name, self.__parent, \
+            self.__accumNames = state
+
     def __delitem__( self, i ):
         if isinstance(i,(int,slice)):
             del self.__toklist[i]
@@ -656,6 +671,50 @@ class ParserElement(object):
     def postParse( self, instring, loc, tokenlist ):
         return tokenlist
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        """Non-raising variant of parseImpl, returns None where parseImpl would raise
+           ParseException.  The expressions used most often override it, the others
+           fall back to catching the exception of parseImpl."""
+        try:
+            return self.parseImpl( instring, loc, doActions )
+        except (ParseException,IndexError):
+            return None
+
+    def _tryMatch( self, instring, loc, doActions=True, callPreParse=True ):
+        """Non-raising variant of _parse, returns None instead of raising ParseException."""
+        if self.debug or self.failAction or ParserElement._packratEnabled:
+            try:
+                return self._parse( instring, loc, doActions, callPreParse )
+            except (ParseException,IndexError):
+                return None
+
+        if callPreParse:
+            preloc = self.preParse( instring, loc )
+        else:
+            preloc = loc
+        tokensStart = loc
+        ret = self._tryMatchImpl( instring, preloc, doActions )
+        if ret is None:
+            return None
+        loc,tokens = ret
+
+        tokens = self.postParse( instring, loc, tokens )
+
+        retTokens = ParseResults( tokens, self.resultsName, asList=self.saveAsList, modal=self.modalResults )
+        if self.parseAction and doActions:
+            try:
+                for fn in self.parseAction:
+                    tokens = fn( instring, tokensStart, retTokens )
+                    if tokens is not None:
+                        retTokens = ParseResults( tokens, 
+                                                  self.resultsName, 
+                                                  asList=self.saveAsList and isinstance(tokens,(ParseResults,list)), 
+                                                  modal=self.modalResults )
+            except ParseException:
+                return None
+
+        return loc, retTokens
+
     #~ @profile
     def _parseNoCache( self, instring, loc, doActions=True, callPreParse=True ):
         debugging = ( self.debug ) #and doActions )
@@ -733,6 +792,20 @@ class ParserElement(object):
 
     def tryParse( self, instring, loc ):
         return self._parse( instring, loc, doActions=False )[0]
+
+    def tryMatch( self, instring, loc=0 ):
+        """Match the expression at the given location of the string, without raising 
+           ParseException if it does not match.  Returns the (loc, tokens) tuple of the
+           match, where loc is the location where the match ends, or None if there is
+           no match.  Unlike parseString, the string is used as-is, tabs are not expanded.
+           Useful when most of the attempts are expected to miss, since no exception is
+           raised and caught along the way for the commonly used expressions.
+           Like parseString, it starts with an empty packrat cache.
+        """
+        if not self.streamlined:
+            self.streamline()
+        ParserElement.resetCache()
+        return self._tryMatch( instring, loc )
     
     # this method gets repeatedly called during backtracking with the same arguments -
     # we can cache these arguments and save ourselves the trouble of re-parsing the contained expression
@@ -746,11 +819,13 @@ class ParserElement(object):
                 if isinstance(value,ParseBaseException):
                     value.loc = loc
                 raise value
-            return value
+            # the results are extended in place by the enclosing expressions, so the
+            # cache keeps its own copy and hands out copies of it
+            return value[0], value[1].copy()
         else:
             try:
-                ParserElement._exprArgCache[ lookup ] = \
-                    value = self._parseNoCache( instring, loc, doActions, callPreParse )
+                value = self._parseNoCache( instring, loc, doActions, callPreParse )
+                ParserElement._exprArgCache[ lookup ] = ( value[0], value[1].copy() )
                 return value
             except ParseBaseException, pe:
                 ParserElement._exprArgCache[ lookup ] = pe
@@ -1099,6 +1174,11 @@ class Literal(Token):
         exc.pstr = instring
         raise exc
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        if instring.startswith(self.match,loc):
+            return loc+self.matchLen, self.match
+        return None
+
 class Keyword(Token):
     """Token to exactly match a specified string as a keyword, that is, it must be 
        immediately followed by a non-keyword character.  Compare with Literal::
@@ -1148,6 +1228,15 @@ class Keyword(Token):
         exc.loc = loc
         exc.pstr = instring
         raise exc
+
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        if self.caseless:
+            return super(Keyword,self)._tryMatchImpl( instring, loc, doActions )
+        if (instring.startswith(self.match,loc) and
+            (loc >= len(instring)-self.matchLen or instring[loc+self.matchLen] not in self.identChars) and
+            (loc == 0 or instring[loc-1] not in self.identChars) ):
+            return loc+self.matchLen, self.match
+        return None
         
     def copy(self):
         c = super(Keyword,self).copy()
@@ -1183,6 +1272,9 @@ class CaselessLiteral(Literal):
         exc.pstr = instring
         raise exc
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        return ParserElement._tryMatchImpl( self, instring, loc, doActions )
+
 class CaselessKeyword(Keyword):
     def __init__( self, matchString, identChars=Keyword.DEFAULT_KEYWORD_CHARS ):
         super(CaselessKeyword,self).__init__( matchString, identChars, caseless=True )
@@ -1197,6 +1289,9 @@ class CaselessKeyword(Keyword):
         exc.pstr = instring
         raise exc
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        return ParserElement._tryMatchImpl( self, instring, loc, doActions )
+
 class Word(Token):
     """Token for matching words composed of allowed character sets.
        Defined with string containing all allowed initial characters,
@@ -1291,6 +1386,14 @@ class Word(Token):
 
         return loc, instring[start:loc]
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        if self.re:
+            result = self.re.match(instring,loc)
+            if not result:
+                return None
+            return result.end(),result.group()
+        return super(Word,self)._tryMatchImpl( instring, loc, doActions )
+
     def __str__( self ):
         try:
             return super(Word,self).__str__()
@@ -1358,6 +1461,19 @@ class Regex(Token):
             for k in d.keys():
                 ret[k] = d[k]
         return loc,ret
+
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        result = self.re.match(instring,loc)
+        if not result:
+            return None
+        
+        loc = result.end()
+        d = result.groupdict()
+        ret = ParseResults(result.group())
+        if d:
+            for k in d.keys():
+                ret[k] = d[k]
+        return loc,ret
     
     def __str__( self ):
         try:
@@ -1458,7 +1574,6 @@ class QuotedString(Token):
         
         loc = result.end()
         ret = result.group()
-        print ret
         
         if self.unquoteResults:
             
@@ -1847,6 +1962,20 @@ class And(ParseExpression):
                 resultlist += exprtokens
         return loc, resultlist
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        ret = self.exprs[0]._tryMatch( instring, loc, doActions )
+        if ret is None:
+            return None
+        loc, resultlist = ret
+        for e in self.exprs[1:]:
+            ret = e._tryMatch( instring, loc, doActions )
+            if ret is None:
+                return None
+            loc, exprtokens = ret
+            if exprtokens or exprtokens.keys():
+                resultlist += exprtokens
+        return loc, resultlist
+
     def __iadd__(self, other ):
         if isinstance( other, basestring ):
             other = Literal( other )
@@ -1909,6 +2038,18 @@ class Or(ParseExpression):
 
         return maxMatchExp._parse( instring, loc, doActions )
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        maxMatchLoc = -1
+        for e in self.exprs:
+            ret = e._tryMatch( instring, loc, False )
+            if ret is not None and ret[0] > maxMatchLoc:
+                maxMatchLoc = ret[0]
+                maxMatchExp = e
+        
+        if maxMatchLoc < 0:
+            return None
+        return maxMatchExp._tryMatch( instring, loc, doActions )
+
     def __ixor__(self, other ):
         if isinstance( other, basestring ):
             other = Literal( other )
@@ -1967,6 +2108,13 @@ class MatchFirst(ParseExpression):
             else:
                 raise ParseException(instring, loc, "no defined alternatives to match", self)
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        for e in self.exprs:
+            ret = e._tryMatch( instring, loc, doActions )
+            if ret is not None:
+                return ret
+        return None
+
     def __ior__(self, other ):
         if isinstance( other, basestring ):
             other = Literal( other )
@@ -2085,6 +2233,28 @@ class ParseElementEnhance(ParserElement):
             return self.expr._parse( instring, loc, doActions )
         else:
             raise ParseException("",loc,self.errmsg,self)
+
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        if self.expr is not None:
+            return self.expr._tryMatch( instring, loc, doActions )
+        else:
+            return None
+
+    def _tryMatchMore( self, instring, ret, doActions ):
+        # the repetitions of ZeroOrMore and OneOrMore after the first match
+        loc, tokens = ret
+        hasIgnoreExprs = ( len(self.ignoreExprs) > 0 )
+        while 1:
+            if hasIgnoreExprs:
+                preloc = self.skipIgnorables( instring, loc )
+            else:
+                preloc = loc
+            ret = self.expr._tryMatch( instring, preloc, doActions )
+            if ret is None:
+                return loc, tokens
+            loc, tmptokens = ret
+            if tmptokens or tmptokens.keys():
+                tokens += tmptokens
             
     def leaveWhitespace( self ):
         self.skipWhitespace = False
@@ -2148,6 +2318,11 @@ class FollowedBy(ParseElementEnhance):
         self.expr.tryParse( instring, loc )
         return loc, []
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        if self.expr._tryMatch( instring, loc, False ) is None:
+            return None
+        return loc, []
+
 
 class NotAny(ParseElementEnhance):
     """Lookahead to disallow matching with the given parse expression.  NotAny
@@ -2176,6 +2351,11 @@ class NotAny(ParseElementEnhance):
             raise exc
         return loc, []
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        if self.expr._tryMatch( instring, loc, False ) is not None:
+            return None
+        return loc, []
+
     def __str__( self ):
         if hasattr(self,"name"):
             return self.name
@@ -2210,6 +2390,12 @@ class ZeroOrMore(ParseElementEnhance):
 
         return loc, tokens
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        ret = self.expr._tryMatch( instring, loc, doActions )
+        if ret is None:
+            return loc, []
+        return self._tryMatchMore( instring, ret, doActions )
+
     def __str__( self ):
         if hasattr(self,"name"):
             return self.name
@@ -2245,6 +2431,13 @@ class OneOrMore(ParseElementEnhance):
 
         return loc, tokens
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        # must be at least one
+        ret = self.expr._tryMatch( instring, loc, doActions )
+        if ret is None:
+            return None
+        return self._tryMatchMore( instring, ret, doActions )
+
     def __str__( self ):
         if hasattr(self,"name"):
             return self.name
@@ -2286,6 +2479,14 @@ class Optional(ParseElementEnhance):
                 tokens = []
         return loc, tokens
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        ret = self.expr._tryMatch( instring, loc, doActions )
+        if ret is not None:
+            return ret
+        if self.defaultValue is not _optionalNotMatched:
+            return loc, [ self.defaultValue ]
+        return loc, []
+
     def __str__( self ):
         if hasattr(self,"name"):
             return self.name
@@ -2338,6 +2539,28 @@ class SkipTo(ParseElementEnhance):
         exc.pstr = instring
         raise exc
 
+    def _tryMatchImpl( self, instring, loc, doActions=True ):
+        startLoc = loc
+        instrlen = len(instring)
+        expr = self.expr
+        while loc <= instrlen:
+            loc = expr.skipIgnorables( instring, loc )
+            if expr._tryMatch( instring, loc, False, False ) is not None:
+                if self.includeMatch:
+                    skipText = instring[startLoc:loc]
+                    ret = expr._tryMatch( instring, loc )
+                    if ret is None:
+                        return None
+                    loc,mat = ret
+                    if mat:
+                        return loc, [ skipText, mat ]
+                    else:
+                        return loc, [ skipText ]
+                else:
+                    return loc, [ instring[startLoc:loc] ]
+            loc += 1
+        return None
+
 class Forward(ParseElementEnhance):
     """Forward declaration of an expression to be defined later -
        used for recursive grammars, such as algebraic infix notation.
@@ -27,13 +27,22 @@ from shutil import copy
 pyFilesToDeploy = [
         "cppgen.py",
         "cppheadergen.py",
+        "cppheadergrammar.py",
+        "cppheadermodel.py",
         "cppheaderobserver.py",
         "cppheaderparser.py",
         "cppheaderparsertracker.py",
+        "cppmerge.py",
+        "cppparsecache.py",
+        "cppsource.py",
         "cppunitgen.py",
+        "cpptokenizer.py",
         "docgen.py",
         "fgconfig.py",
         "fgen.py",
+        "fgenc.py",
+        "fgenwatch.py",
+        "fgendaemon.py",
         "fgutils.py",
         "filedepot.py",
         "filegenerator.py",
@@ -75,6 +84,7 @@ def main():
     print "Notice: the only one step for you to do manually is:\n"
     print "Add \"alias fgen <path_of_python_2.5> %s\" to your shell configuration." % \
         path.join(getHomePath(), "local/scripts/fgen/fgen.py")
+    print "To keep fgen warm, run fgendaemon.py and alias fgen to fgenc.py instead."
     print "\nfgen has been set up successfully! Enjoy it! :)"
 
 if __name__ == "__main__":
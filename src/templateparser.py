@@ -21,6 +21,7 @@
 from __future__ import with_statement
 from fgconfig import XmlConfig
 from os import path
+from os import stat
 from datetime import date
 import re
 
@@ -31,12 +32,20 @@ class TemplateParserObserver:
         pass
 
 class TemplateParser:
+    """
+    Renders a template into the output file. A template is compiled once into the
+    list of its segments, in which the even ones are literals and the odd ones are
+    the names of the variables, and kept per process by its path and mtime. Rendering
+    is a single join of the segments with the values of the variables.
+    """
+    __varRe = re.compile(r"\${(?P<var>\b\w+\b)}")
+    __templates = {}
+
     def __init__(self, tmpfile, output):
         self.__config = XmlConfig()
         self.__template = path.join(self.__config.getConfigPath(), tmpfile)
         self.__output = output
         self.__observers = []
-        self.__varRe = re.compile(r"\${(?P<var>\b\w+\b)}")
 
     def addObserver(self, observer):
         self.__observers.append(observer)
@@ -45,36 +54,50 @@ class TemplateParser:
         self.__observers.remove(observer)
 
     def parse(self):
+        content = self.__render(self.getSegments(self.__template))
         with open(self.__output, "w+") as stream:
-            map(lambda line:self.__processLine(line, stream), open(self.__template))
+            if not self.__observers:
+                stream.write(content)
+                return
+            for line in content.splitlines(True):
+                stream.write(line)
+                map(lambda ob:ob.onPostProcessLine(line, stream), self.__observers)
 
-    def __processLine(self, line, stream):
-        line = self.__replaceVars(line)
-        stream.write(line)
-        map(lambda ob:ob.onPostProcessLine(line, stream), self.__observers)
+    def getSegments(cls, template):
+        """
+        Return the compiled segments of the template, compile it if it's not compiled
+        yet or it's changed since.
+        """
+        mtime = stat(template).st_mtime
+        cached = cls.__templates.get(template)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(template) as f:
+            segments = cls.__varRe.split(f.read())
+        cls.__templates[template] = (mtime, segments)
+        return segments
+    getSegments = classmethod(getSegments)
 
-    def __replaceVars(self, s):
-        match = self.__varRe.search(s)
-        if match == None:
-            return s
+    def __render(self, segments):
+        values = {}
+        for var in set(segments[1::2]):
+            values[var] = self.__getValue(var)
+        rendered = list(segments)
+        rendered[1::2] = [values[var] for var in segments[1::2]]
+        return "".join(rendered)
 
-        start, end = match.span()
-        var = match.group("var").lower()
-        if var == "wrapper":
-            s = self.__replaceWrapper(s, start, end)
-        elif var == "date":
-            s = "".join((s[:start], date.today().isoformat(), s[end:]))
-        else:
-            value = self.__config.get(var)
-            if  value != None:
-                start, end = match.span()
-                s = self.__varRe.sub(value, s)
-        return "".join((s[:end], self.__replaceVars(s[end:])))
+    def __getValue(self, var):
+        name = var.lower()
+        if name == "wrapper":
+            return self.__getWrapper()
+        elif name == "date":
+            return date.today().isoformat()
+        # an unknown variable raises ValueError from XmlConfig.get, as it always has
+        return self.__config.get(name)
 
-    def __replaceWrapper(self, s, start, end):
+    def __getWrapper(self):
         head, tail = path.split(self.__output)
         name, ext = path.splitext(tail)
         value = self.__config.getWrapperPrefix()
         value = value if value else ""
-        wrapper = "%s%s" % (value, name.upper())
-        return "".join((s[:start], wrapper, s[end:]))
+        return "%s%s" % (value, name.upper())
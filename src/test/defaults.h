@@ -0,0 +1,12 @@
+namespace defaults
+{
+    class Defaults
+    {
+    public:
+        void call(int a = max(1, 2), int b = 0);
+        void construct(const std::string& s = std::string("a, b"), char c = ',');
+        void index(int i = table[1 >> 1], int j = (i < 2 ? 1 : 2), int k = 3);
+        void shift(int a = 1 >> 2, int b = x<y>(1));
+        Defaults(int n = 1 << 4, const char* name = "(\"n\")");
+    };
+}
@@ -0,0 +1,38 @@
+namespace inlines
+{
+
+class Inline
+{
+public:
+    int nested(int n)
+    {
+        if (n > 0)
+        {
+            for (int i = 0; i < n; ++i) { n += i; }
+        }
+        return n;
+    }
+    void braceLiterals()
+    {
+        const char* open = "{";
+        char close = '}';
+        print("}}{", '{');
+    }
+    void braceComments()
+    {
+        // a } in a comment
+        /* and { in
+           a } block comment */
+        call();
+    }
+    void oneLine() { if (n) { call(); } } void sameLine();
+    void after();
+};
+
+class After
+{
+public:
+    void afterAll();
+};
+
+}
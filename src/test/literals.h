@@ -0,0 +1,15 @@
+namespace literals
+{
+
+class Literals
+{
+public:
+    void setUrl(const char* url = "http://example.com"); // the url
+    void setComment(const char* start = "/*", const char* end = "*/");
+    void setQuote(char quote = '\'', char slash = '/');
+    /* the "quotes" aren't literals here */ void after(); /* nor '\'' */
+    void setSlashes(const char* s = "\"//\""); /* a
+    multi-line comment */ void last();
+};
+
+}
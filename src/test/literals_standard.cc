@@ -0,0 +1,36 @@
+// $Id$
+
+/**
+ * @author Kevin Wan <wanjunfeng@gmail.com>
+ * @date   &date
+ */
+#include "literals.h"
+
+namespace literals
+{
+
+void Literals::setUrl(const char* url)
+{
+}
+
+void Literals::setComment(const char* start, const char* end)
+{
+}
+
+void Literals::setQuote(char quote, char slash)
+{
+}
+
+void Literals::after()
+{
+}
+
+void Literals::setSlashes(const char* s)
+{
+}
+
+void Literals::last()
+{
+}
+
+}
@@ -0,0 +1,6 @@
+class SameLine
+{
+public:
+    int first(int a); int second(int b);
+    void third(int c);
+};
@@ -0,0 +1,15 @@
+/// <summary>
+/// </summary>
+class SameLine
+{
+public:
+    /// <summary>
+    /// </summary>
+    /// <param name="a"></param>
+    /// <returns></returns>
+    int first(int a); int second(int b);
+    /// <summary>
+    /// </summary>
+    /// <param name="c"></param>
+    void third(int c);
+};
@@ -0,0 +1,45 @@
+// $Id$
+
+/**
+ * @author Kevin Wan <wanjunfeng@gmail.com>
+ * @date   &date
+ */
+#include "sample.h"
+
+namespace keggle
+{
+
+void SampleStruct::printStruct(const string& s) const
+{
+}
+
+unsigned int SampleStruct::getPrivate() const
+{
+}
+
+template <typename T>
+void Sample::print()
+{
+}
+
+Sample::operator int()
+{
+}
+
+ostream& Sample::operator<<()
+{
+}
+
+Sample& Sample::operator++()
+{
+}
+
+bool Sample::operator==(const Sample& other) const
+{
+}
+
+Sample::Sample()
+{
+}
+
+}
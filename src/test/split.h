@@ -0,0 +1,16 @@
+namespace split
+{
+
+enum Flags { A = 1 << 0, B = 1 << 1, C = 1 << 2 };
+enum Cmp { X = (3 > 2), Y, Z };
+enum Masks { M1 = FLAG << 2, M2 = FLAG >> 1, M3 = M1 < M2, M4 };
+
+class Split
+{
+public:
+    void f(int a = 1 << 2, int b = 3);
+    void g(int a = x < y, int b = 3);
+    void h(const std::map<int, int>& m, int c = 2 > 1, int d = 0);
+};
+
+}
@@ -0,0 +1,24 @@
+// $Id$
+
+/**
+ * @author Kevin Wan <wanjunfeng@gmail.com>
+ * @date   &date
+ */
+#include "split.h"
+
+namespace split
+{
+
+void Split::f(int a, int b)
+{
+}
+
+void Split::g(int a, int b)
+{
+}
+
+void Split::h(const std::map<int, int>& m, int c, int d)
+{
+}
+
+}
@@ -0,0 +1,26 @@
+namespace statements
+{
+
+class Open
+{
+public:
+    void open(char c = '(',
+              int n = 0);
+    void close(const char* s = "(;",
+               int n = 0);
+};
+
+class Split
+{
+public:
+    void split(const char* sep = ";",
+               char quote = '\'');
+};
+
+class After
+{
+public:
+    void after();
+};
+
+}
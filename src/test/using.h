@@ -0,0 +1,11 @@
+namespace a
+{
+
+class Foo
+{
+public:
+    void bar();
+    int baz(int n) const;
+};
+
+}